@@ -0,0 +1,219 @@
+"""Offline benchmarks of the parser modes.
+
+Times the fetch-free parse path of each page kind and the end-to-end
+path of each mode with the corpus served by a mocked session, and
+reports the per-page and total timings with the peak memory.
+
+    python benchmarks/bench.py              # compare with the baseline
+    python benchmarks/bench.py --save       # save a new baseline
+"""
+import inspect
+import json
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable
+
+import requests_mock
+from requests_cache import CachedSession
+
+from bootstrap import BENCH_DIR
+from constants import ARTIFACT_ZIP_LINK
+from corpus import build_corpus
+
+import main
+
+BASELINE_FILE = BENCH_DIR / 'baseline.json'
+MAIN_FILE = BENCH_DIR.parent / 'src' / 'main.py'
+# Extraction function of each page kind
+PARSE_FUNCTIONS = {
+    'whatsnew_index': 'whats_new_links',
+    'whatsnew_page': 'whats_new_article',
+    'main_page': 'version_links',
+    'download': 'artifact_links',
+    'pep_index': 'pep_rows',
+    'pep_page': 'pep_status',
+}
+VARIANTS = {
+    'bs4': {'engine': 'bs4', 'full_parse': False},
+    'bs4-full': {'engine': 'bs4', 'full_parse': True},
+    'lxml': {'engine': 'lxml', 'full_parse': False},
+}
+
+
+def measure(function: Callable, repeat: int) -> dict[str, float]:
+    """Best time of the runs and the peak memory of one more run."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_kib': peak / 1024}
+
+
+def parse_benchmarks(
+        corpus: dict, variants: dict, repeat: int
+) -> dict[str, dict]:
+    results = {}
+    for variant, options in variants.items():
+        parser = main.load_parser(options['engine'])
+        for kind, function_name in PARSE_FUNCTIONS.items():
+            # The records shared between the calls would be timed
+            # instead of the parse
+            function = inspect.unwrap(getattr(parser, function_name))
+            pages = list(corpus[kind].values())
+
+            def parse_all():
+                for markup in pages:
+                    function(markup, options['full_parse'])
+            result = measure(parse_all, repeat)
+            result['per_page'] = result['seconds'] / len(pages)
+            results[f'parse/{kind}/{variant}'] = result
+    return results
+
+
+def mock_corpus(mock: requests_mock.Mocker, corpus: dict) -> None:
+    for pages in corpus.values():
+        for url, markup in pages.items():
+            mock.get(url, text=markup)
+    # Small archive for the download mode
+    mock.register_uri('HEAD', requests_mock.ANY, status_code=405)
+    mock.get(ARTIFACT_ZIP_LINK, content=b'PK' * 1024)
+
+
+def clear_shared_records(parser) -> None:
+    for function_name in PARSE_FUNCTIONS.values():
+        function = getattr(parser, function_name)
+        if hasattr(function, 'cache_clear'):
+            function.cache_clear()
+
+
+def mode_benchmarks(
+        corpus: dict, variants: dict, repeat: int
+) -> dict[str, dict]:
+    """Runs the modes on a cold and on a warm cache."""
+    results = {}
+    # Options of each mode and the number of pages it fetches
+    modes = {
+        'whats-new': ({'workers': 1}, 1 + len(corpus['whatsnew_page'])),
+        'latest-versions': ({}, 1),
+        'download': ({}, 2),
+        'pep': ({'workers': 1}, 1 + len(corpus['pep_page'])),
+    }
+    with requests_mock.Mocker() as mock, tempfile.TemporaryDirectory() as tmp:
+        mock_corpus(mock, corpus)
+        main.BASE_DIR = Path(tmp)
+        for variant, options in variants.items():
+            for mode, (mode_options, pages) in modes.items():
+                function = main.MODE_TO_FUNCTION[mode]
+                parser = main.load_parser(options['engine'])
+
+                def run(session=None):
+                    if session is None:
+                        # The cold run parses the index pages anew too
+                        clear_shared_records(parser)
+                    function(
+                        session or CachedSession(backend='memory'),
+                        **mode_options, **options
+                    )
+                warm_session = CachedSession(backend='memory')
+                run(warm_session)
+                for cache, session in (('cold', None), ('warm', warm_session)):
+                    result = measure(lambda: run(session), repeat)
+                    result['per_page'] = result['seconds'] / pages
+                    results[f'mode/{mode}/{cache}/{variant}'] = result
+    return results
+
+
+def startup_benchmarks(repeat: int) -> dict[str, dict]:
+    """Times the CLI runs which must not import the heavy modules."""
+    results = {}
+    for name, args in (('help', ['-h']), ('bad-args', ['unknown-mode'])):
+        command = [sys.executable, str(MAIN_FILE), *args]
+
+        def run():
+            subprocess.run(command, capture_output=True)
+        result = measure(run, repeat)
+        result['per_page'] = result['seconds']
+        results[f'startup/{name}'] = result
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Names of the benchmarks slower than the baseline by the threshold."""
+    return [
+        name for name, result in results.items()
+        if name in baseline
+        and result['seconds'] > baseline[name]['seconds'] * (1 + threshold)
+    ]
+
+
+def report(results: dict, baseline: dict) -> None:
+    print(f'{"benchmark":<42}{"total, ms":>11}{"page, ms":>10}'
+          f'{"peak, KiB":>11}{"vs base":>9}')
+    for name, result in results.items():
+        change = ''
+        if name in baseline:
+            ratio = result['seconds'] / baseline[name]['seconds']
+            change = f'{(ratio - 1) * 100:+.0f}%'
+        print(
+            f'{name:<42}{result["seconds"] * 1000:>11.1f}'
+            f'{result["per_page"] * 1000:>10.3f}'
+            f'{result["peak_kib"]:>11.0f}{change:>9}'
+        )
+
+
+def main_bench() -> None:
+    parser = ArgumentParser(description='Offline parser benchmarks')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', action='store_true',
+                        help='Save the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed slowdown against the baseline')
+    parser.add_argument('--only', choices=('parse', 'mode', 'startup'),
+                        help='Run only one group of the benchmarks')
+    parser.add_argument('--variant', choices=VARIANTS, action='append',
+                        help='Engine variants to run, all by default')
+    args = parser.parse_args()
+    # The warnings of the modes would only add noise to the report
+    logging.disable(logging.WARNING)
+
+    corpus = build_corpus()
+    variants = {
+        name: options for name, options in VARIANTS.items()
+        if not args.variant or name in args.variant
+    }
+    results = {}
+    if args.only in (None, 'parse'):
+        results.update(parse_benchmarks(corpus, variants, args.repeat))
+    if args.only in (None, 'mode'):
+        results.update(mode_benchmarks(corpus, variants, args.repeat))
+    if args.only in (None, 'startup'):
+        results.update(startup_benchmarks(args.repeat))
+    baseline = {}
+    if BASELINE_FILE.exists():
+        baseline = json.loads(BASELINE_FILE.read_text(encoding='utf-8'))
+    report(results, baseline)
+    if args.save:
+        BASELINE_FILE.write_text(
+            json.dumps(results, indent=1, sort_keys=True), encoding='utf-8'
+        )
+        print(f'The baseline has been saved -> {BASELINE_FILE}')
+        return
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print('Slower than the baseline:', *regressions, sep='\n  ')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_bench()
@@ -0,0 +1,11 @@
+"""Makes the modules of src importable by the benchmarks.
+
+It is imported before them, so the settings below apply to the parser."""
+import os
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.append(str(BENCH_DIR.parent / 'src'))
+# The progress bars would only add noise to the timings
+os.environ.setdefault('TQDM_DISABLE', '1')
@@ -0,0 +1,55 @@
+"""Offline page corpus for the benchmarks.
+
+The corpus is built from the page snapshots in benchmarks/pages:
+the index pages are used as they are, the links found on them are
+served with the article and pep page snapshots. The snapshots can be
+refreshed from the live sites with record.py."""
+from urllib.parse import urljoin
+
+from bootstrap import BENCH_DIR
+from constants import EXPECTED_STATUS, MAIN_DOC_URL, PEP_DOC_URL
+from parsers import soup
+
+PAGES_DIR = BENCH_DIR / 'pages'
+WHATS_NEW_URL = urljoin(MAIN_DOC_URL, 'whatsnew/')
+DOWNLOAD_URL = urljoin(MAIN_DOC_URL, 'download.html')
+# Snapshot file of each page kind and the URL it was recorded from
+SNAPSHOTS = {
+    'main_page': MAIN_DOC_URL,
+    'whatsnew_index': WHATS_NEW_URL,
+    'whatsnew_page': urljoin(WHATS_NEW_URL, '3.10.html'),
+    'download': DOWNLOAD_URL,
+    'pep_index': PEP_DOC_URL,
+    'pep_page': urljoin(PEP_DOC_URL, 'pep-0008/'),
+}
+
+
+def read_snapshot(name: str) -> str:
+    return (PAGES_DIR / f'{name}.html').read_text(encoding='utf-8')
+
+
+def build_corpus() -> dict[str, dict[str, str]]:
+    """Pages of the corpus by kind, each kind maps URLs to the markup."""
+    whatsnew_page = read_snapshot('whatsnew_page')
+    whatsnew_pages = {
+        urljoin(WHATS_NEW_URL, href): whatsnew_page
+        for href in soup.whats_new_links(read_snapshot('whatsnew_index'))
+    }
+    pep_page = read_snapshot('pep_page')
+    pep_pages = {}
+    rows = soup.pep_rows(read_snapshot('pep_index'))
+    for number, row in enumerate(rows):
+        # Every page gets one of the statuses expected for its letter
+        expected = EXPECTED_STATUS[row.status_letter]
+        status = expected[number % len(expected)]
+        pep_pages[urljoin(PEP_DOC_URL, row.link)] = pep_page.replace(
+            '>Active</abbr>', f'>{status}</abbr>'
+        )
+    return {
+        'main_page': {MAIN_DOC_URL: read_snapshot('main_page')},
+        'whatsnew_index': {WHATS_NEW_URL: read_snapshot('whatsnew_index')},
+        'whatsnew_page': whatsnew_pages,
+        'download': {DOWNLOAD_URL: read_snapshot('download')},
+        'pep_index': {PEP_DOC_URL: read_snapshot('pep_index')},
+        'pep_page': pep_pages,
+    }
@@ -0,0 +1,21 @@
+"""Records the page snapshots of the corpus from the live sites.
+
+    python benchmarks/record.py
+"""
+import requests
+
+from corpus import PAGES_DIR, SNAPSHOTS
+
+
+def main() -> None:
+    for name, url in SNAPSHOTS.items():
+        response = requests.get(url)
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+        path = PAGES_DIR / f'{name}.html'
+        path.write_text(response.text, encoding='utf-8')
+        print(f'{url} -> {path}')
+
+
+if __name__ == '__main__':
+    main()
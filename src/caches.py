@@ -0,0 +1,393 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Iterator, Optional
+
+from requests_cache.backends.base import BaseCache, BaseStorage
+from requests_cache.backends.sqlite import DbDict, DbPickleDict
+
+from constants import CACHE_TOUCH_BATCH
+from enums.caches import CacheBackend
+
+
+class LruDbDict(DbPickleDict):
+    """SQLite table of the responses keeping at most max_size bytes.
+
+    The size and the last access time are stored next to each response,
+    the least recently used responses are evicted first. The accesses
+    are written in batches, and the total size is kept in memory."""
+
+    def __init__(
+            self, db_path: str, max_size: Optional[int] = None, **kwargs
+    ) -> None:
+        super().__init__(db_path, **kwargs)
+        self.max_size = max_size
+        self._lock = threading.RLock()
+        # Total size of the responses, counted on the first write
+        self._size = None
+        # Last access times of the keys not written yet
+        self._touched = {}
+        table = self.table_name
+        with self.connection(True) as con:
+            # The readers do not wait for the writer with the WAL journal
+            con.execute('PRAGMA journal_mode = WAL')
+            columns = {
+                row[1]
+                for row in con.execute(f'PRAGMA table_info(`{table}`)')
+            }
+            # The tables of the older caches get the columns as well
+            for column in ('size', 'accessed'):
+                if column not in columns:
+                    con.execute(
+                        f'ALTER TABLE `{table}` ADD COLUMN {column} DEFAULT 0'
+                    )
+            # Sizes are summed from the index, the responses are not read
+            con.execute(
+                f'CREATE INDEX IF NOT EXISTS `{table}_lru` '
+                f'ON `{table}` (accessed, size)'
+            )
+
+    def _total(self, con: sqlite3.Connection) -> int:
+        if self._size is None:
+            self._size = con.execute(
+                f'SELECT COALESCE(SUM(size), 0) FROM `{self.table_name}`'
+            ).fetchone()[0]
+        return self._size
+
+    def _stored_size(self, con: sqlite3.Connection, key: str) -> int:
+        row = con.execute(
+            f'SELECT size FROM `{self.table_name}` WHERE key = ?', (key,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def __setitem__(self, key: str, item) -> None:
+        value = sqlite3.Binary(self.serialize(item))
+        with self._lock, self.connection(True) as con:
+            size = self._total(con) - self._stored_size(con, key)
+            # The pending accesses share the transaction of the write
+            self._flush(con)
+            con.execute(
+                f'INSERT OR REPLACE INTO `{self.table_name}` '
+                f'(key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, len(value), time.time())
+            )
+            self._size = size + len(value)
+            if self.max_size is not None and self._size > self.max_size:
+                self._evict(con, self.max_size)
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock, self.connection(True) as con:
+            size = self._stored_size(con, key)
+            deleted = con.execute(
+                f'DELETE FROM `{self.table_name}` WHERE key = ?', (key,)
+            )
+            if not deleted.rowcount:
+                raise KeyError(key)
+            if self._size is not None:
+                self._size -= size
+
+    def _flush(self, con: sqlite3.Connection) -> None:
+        if self._touched:
+            con.executemany(
+                f'UPDATE `{self.table_name}` SET accessed = ? WHERE key = ?',
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def _evict(self, con: sqlite3.Connection, max_size: int) -> None:
+        """Deletes the oldest responses until the rest fit in the size."""
+        self._flush(con)
+        excess = self._total(con) - max_size
+        evicted = []
+        rows = con.execute(
+            f'SELECT key, size FROM `{self.table_name}` ORDER BY accessed'
+        )
+        for key, size in rows:
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+            self._size -= size
+        rows.close()
+        con.executemany(
+            f'DELETE FROM `{self.table_name}` WHERE key = ?', evicted
+        )
+
+    def clear(self) -> None:
+        # The table is kept, it has the columns of the eviction
+        with self._lock:
+            with self.connection(True) as con:
+                con.execute(f'DELETE FROM `{self.table_name}`')
+            self._size = 0
+            self._touched.clear()
+            self.vacuum()
+
+    def touch(self, key: str) -> None:
+        with self._lock:
+            self._touched[key] = time.time()
+            if len(self._touched) >= CACHE_TOUCH_BATCH:
+                self.flush()
+
+    def flush(self) -> None:
+        """Writes the accesses kept in memory."""
+        with self._lock:
+            if self._touched:
+                with self.connection(True) as con:
+                    self._flush(con)
+
+    def compact(self) -> None:
+        """Evicts the responses beyond the size and returns
+        the free pages of the database file to the file system."""
+        with self._lock:
+            with self.connection(True) as con:
+                self._flush(con)
+                # The other processes may have written to the cache
+                self._size = None
+                if self.max_size is not None:
+                    if self._total(con) > self.max_size:
+                        self._evict(con, self.max_size)
+            with self.connection() as con:
+                con.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                con.execute('VACUUM')
+
+
+class LruFileDict(BaseStorage):
+    """Folder with a file for each response keeping at most max_size bytes.
+
+    The file is named by the cache key, which is a hex digest, and
+    its modification time is the last access time of the response."""
+
+    def __init__(
+            self, path: Path, max_size: Optional[int] = None, **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self._lock = threading.RLock()
+        # Total size of the files, counted on the first write
+        self._size = None
+
+    def _file(self, key: str) -> Path:
+        return self.path / key
+
+    def _files(self) -> list[os.DirEntry]:
+        return [
+            entry for entry in os.scandir(self.path)
+            if entry.is_file() and not entry.name.endswith('.tmp')
+        ]
+
+    def __getitem__(self, key: str):
+        try:
+            return self.deserialize(self._file(key).read_bytes())
+        except FileNotFoundError:
+            raise KeyError(key)
+
+    def __setitem__(self, key: str, item) -> None:
+        value = self.serialize(item)
+        path = self._file(key)
+        temp_path = path.with_name(path.name + '.tmp')
+        with self._lock:
+            if self._size is None:
+                self._size = sum(
+                    entry.stat().st_size for entry in self._files()
+                )
+            try:
+                self._size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            # The file is replaced at once, so it is never read half-written
+            temp_path.write_bytes(value)
+            os.replace(temp_path, path)
+            self._size += len(value)
+            if self.max_size is not None and self._size > self.max_size:
+                self._evict(self.max_size)
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            try:
+                size = self._file(key).stat().st_size
+                self._file(key).unlink()
+            except FileNotFoundError:
+                raise KeyError(key)
+            if self._size is not None:
+                self._size -= size
+
+    def __iter__(self) -> Iterator[str]:
+        for entry in self._files():
+            yield entry.name
+
+    def __len__(self) -> int:
+        return len(self._files())
+
+    def _evict(self, max_size: int) -> None:
+        """Deletes the files beyond the size, the newest are kept."""
+        entries = sorted(
+            ((entry, entry.stat()) for entry in self._files()),
+            key=lambda pair: pair[1].st_mtime, reverse=True
+        )
+        kept = 0
+        for entry, stat in entries:
+            kept += stat.st_size
+            if kept > max_size:
+                os.remove(entry.path)
+        self._size = None
+
+    def touch(self, key: str) -> None:
+        try:
+            os.utime(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def flush(self) -> None:
+        """The accesses are written at once."""
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in os.scandir(self.path):
+                os.remove(entry.path)
+            self._size = 0
+
+    def compact(self) -> None:
+        """Evicts the files beyond the size and the unfinished writes."""
+        with self._lock:
+            for entry in os.scandir(self.path):
+                if entry.name.endswith('.tmp'):
+                    os.remove(entry.path)
+            if self.max_size is not None:
+                self._evict(self.max_size)
+
+
+class LruMemoryDict(MutableMapping):
+    """Responses in memory keeping at most max_size bytes of content."""
+
+    def __init__(self, max_size: Optional[int] = None) -> None:
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _sizeof(item) -> int:
+        return len(getattr(item, 'content', None) or b'')
+
+    def __getitem__(self, key: str):
+        return self._items[key]
+
+    def __setitem__(self, key: str, item) -> None:
+        with self._lock:
+            if key in self._items:
+                del self[key]
+            self._items[key] = item
+            self._size += self._sizeof(item)
+            if self.max_size is not None:
+                self._evict(self.max_size)
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            self._size -= self._sizeof(self._items.pop(key))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._items))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _evict(self, max_size: int) -> None:
+        """Deletes the least recently used items beyond the size,
+        the last written item is kept even if it is larger."""
+        while self._size > max_size and len(self._items) > 1:
+            _, item = self._items.popitem(last=False)
+            self._size -= self._sizeof(item)
+
+    def touch(self, key: str) -> None:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+
+    def flush(self) -> None:
+        """The accesses are kept by the order of the items."""
+
+    def compact(self) -> None:
+        with self._lock:
+            if self.max_size is not None:
+                self._evict(self.max_size)
+
+
+class LruCache(BaseCache):
+    """Cache evicting the least recently used responses.
+    Only the responses served to the session count as used."""
+
+    def get_response(self, key: str, default=None):
+        response = super().get_response(key, default)
+        if response is not default:
+            self.responses.touch(self.redirects.get(key, key))
+        return response
+
+    def flush(self) -> None:
+        """Writes the accesses of the responses kept in memory."""
+        self.responses.flush()
+
+    def compact(self) -> None:
+        """Removes the expired responses and evicts those beyond the size."""
+        self.remove_expired_responses()
+        self.responses.compact()
+        logging.info(f'The cache has been compacted, {self}')
+
+
+class SqliteCache(LruCache):
+    """Cache in one SQLite database file."""
+
+    def __init__(
+            self, name: str, max_size: Optional[int] = None, **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+        kwargs.setdefault('suppress_warnings', True)
+        db_path = os.path.abspath(f'{name}.sqlite')
+        self.responses = LruDbDict(
+            db_path, max_size, table_name='responses', **kwargs
+        )
+        self.redirects = DbDict(db_path, table_name='redirects', **kwargs)
+
+
+class FileCache(LruCache):
+    """Cache in a folder with a file for each response."""
+
+    def __init__(
+            self, name: str, max_size: Optional[int] = None, **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+        kwargs.setdefault('suppress_warnings', True)
+        self.responses = LruFileDict(
+            Path(name, 'responses'), max_size, **kwargs
+        )
+        self.redirects = LruFileDict(Path(name, 'redirects'), **kwargs)
+
+
+class MemoryCache(LruCache):
+    """Cache in the memory of the process, it is lost with the run."""
+
+    def __init__(
+            self, name: str, max_size: Optional[int] = None, **kwargs
+    ) -> None:
+        super().__init__(**kwargs)
+        self.responses = LruMemoryDict(max_size)
+
+
+CACHE_CLASSES = {
+    CacheBackend.SQLITE: SqliteCache,
+    CacheBackend.FILESYSTEM: FileCache,
+    CacheBackend.MEMORY: MemoryCache,
+}
+
+
+def make_cache(
+        backend: str, name: str, max_size: Optional[int] = None
+) -> LruCache:
+    """Cache of the backend with the name, max_size is in bytes."""
+    return CACHE_CLASSES[backend](name, max_size)
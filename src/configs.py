@@ -1,26 +1,90 @@
 import logging
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
+from pathlib import Path
 from logging.handlers import RotatingFileHandler
 from typing import Iterable
 
-from constants import BASE_DIR, DT_FORMAT, LOG_FORMAT
+from constants import (BASE_DIR, CACHE_MAX_SIZE, DEFAULT_WORKERS,
+                       DOWNLOAD_CONNECTIONS, DT_FORMAT, HOST_RATE, LOG_FORMAT,
+                       READ_TIMEOUT, RETRIES)
+from enums.artifacts import Artifact
+from enums.caches import CacheAction, CacheBackend
+from enums.engines import Engine
 from enums.modes import AdditionalMode
+from enums.sessions import SessionType
 from utils import mkdir_and_path
 
 
+def positive_int(value: str) -> int:
+    """Argument type for the options that accept only positive numbers."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f'{value} is not an integer')
+    if number < 1:
+        raise ArgumentTypeError(f'{value} is not a positive integer')
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """Argument type for the counts which may be zero."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f'{value} is not an integer')
+    if number < 0:
+        raise ArgumentTypeError(f'{value} is a negative integer')
+    return number
+
+
+def positive_number(value: str) -> float:
+    """Argument type for the durations and the rates."""
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise ArgumentTypeError(f'{value} is not a number')
+    if not seconds > 0:
+        raise ArgumentTypeError(f'{value} is not a positive number')
+    return seconds
+
+
+def shard(value: str) -> tuple[int, int]:
+    """Argument type for the shard given as "index/count"."""
+    try:
+        index, count = map(int, value.split('/'))
+    except ValueError:
+        raise ArgumentTypeError(f'{value} is not like index/count')
+    if not 1 <= index <= count:
+        raise ArgumentTypeError(f'{value} is not a shard from 1 to count')
+    return index, count
+
+
 def configure_argument_parser(available_modes: Iterable) -> ArgumentParser:
     """Set up the command line argument parser."""
     parser = ArgumentParser(description='Python documentation parser')
     parser.add_argument(
         'mode',
+        nargs='+',
         choices=available_modes,
         help='Режимы работы парсера'
     )
     parser.add_argument(
         '-c',
-        '--clear-cache',
-        action='store_true',
-        help='Очистка кеша'
+        '--cache',
+        choices=CacheAction.to_display,
+        help='Очистка кеша или удаление его устаревших и лишних записей'
+    )
+    parser.add_argument(
+        '--cache-backend',
+        choices=CacheBackend.to_display,
+        default=CacheBackend.SQLITE,
+        help='Хранилище кеша'
+    )
+    parser.add_argument(
+        '--cache-max-size',
+        type=positive_int,
+        default=CACHE_MAX_SIZE,
+        help='Наибольший размер кеша в мегабайтах'
     )
     parser.add_argument(
         '-o',
@@ -28,6 +92,143 @@ def configure_argument_parser(available_modes: Iterable) -> ArgumentParser:
         choices=AdditionalMode.to_display,
         help='Дополнительные способы вывода данных'
     )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=positive_int,
+        default=DEFAULT_WORKERS,
+        help='Количество потоков для загрузки страниц'
+    )
+    parser.add_argument(
+        '--pool-size',
+        type=positive_int,
+        help='Количество соединений с каждым сайтом, '
+             'по умолчанию равно количеству потоков'
+    )
+    parser.add_argument(
+        '--rate',
+        type=positive_number,
+        default=HOST_RATE,
+        help='Количество запросов в секунду к каждому сайту, '
+             'параллельные запросы подстраиваются под ответы сайта'
+    )
+    parser.add_argument(
+        '--timeout',
+        type=positive_number,
+        default=READ_TIMEOUT,
+        help='Время ожидания данных страницы в секундах'
+    )
+    parser.add_argument(
+        '--retries',
+        type=non_negative_int,
+        default=RETRIES,
+        help='Количество повторных запросов неудавшейся страницы'
+    )
+    parser.add_argument(
+        '--hedge-after',
+        type=positive_number,
+        metavar='SECONDS',
+        help='Повторная отправка запроса, на который нет ответа '
+             'за заданное время'
+    )
+    parser.add_argument(
+        '-s',
+        '--session',
+        choices=SessionType.to_display,
+        default=SessionType.SYNC,
+        help='Тип HTTP-сессии, запросы асинхронной сессии тоже '
+             'выполняются в потоках'
+    )
+    parser.add_argument(
+        '-i',
+        '--incremental',
+        action='store_true',
+        help='Загрузка только изменившихся PEP-документов'
+    )
+    parser.add_argument(
+        '-e',
+        '--expire-after',
+        type=positive_int,
+        help='Время актуальности кеша режима в секундах'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=Engine.to_display,
+        default=Engine.BS4,
+        help='Библиотека для извлечения данных из страниц'
+    )
+    parser.add_argument(
+        '-f',
+        '--full-parse',
+        action='store_true',
+        help='Разбор страниц целиком, а не только нужных частей'
+    )
+    parser.add_argument(
+        '-p',
+        '--processes',
+        type=positive_int,
+        help='Количество процессов для разбора страниц, '
+             'по умолчанию страницы разбираются в основном процессе'
+    )
+    parser.add_argument(
+        '--no-extraction-cache',
+        action='store_false',
+        dest='extraction_cache',
+        help='Разбор всех страниц без сохранённых результатов прошлых запусков'
+    )
+    parser.add_argument(
+        '--artifacts',
+        nargs='+',
+        choices=Artifact.to_display,
+        default=[Artifact.PDF_A4],
+        help='Форматы архивов документации, которые загружаются одновременно'
+    )
+    parser.add_argument(
+        '--connections',
+        type=positive_int,
+        default=DOWNLOAD_CONNECTIONS,
+        help='Количество соединений для загрузки архива частями, '
+             'по одному соединению архив загружается одним потоком'
+    )
+    parser.add_argument(
+        '--index-only',
+        action='store_true',
+        help='Подсчет PEP-документов по статусам из таблицы индекса '
+             'без загрузки их страниц'
+    )
+    parser.add_argument(
+        '--verify-sample',
+        type=positive_int,
+        metavar='K',
+        help='Подсчет по таблице индекса с проверкой случайной выборки '
+             'из K страниц PEP-документов'
+    )
+    parser.add_argument(
+        '--shard',
+        type=shard,
+        metavar='INDEX/COUNT',
+        help='Обработка только своей части PEP-документов, '
+             'частичные итоги сохраняются для объединения'
+    )
+    parser.add_argument(
+        '--merge',
+        nargs='+',
+        type=Path,
+        metavar='FILE',
+        help='Объединение частичных итогов PEP без загрузки страниц'
+    )
+    parser.add_argument(
+        '--serve',
+        type=positive_int,
+        metavar='PORT',
+        help='Обновление режимов по расписанию и выдача результатов '
+             'в формате JSON на заданном порту'
+    )
+    parser.add_argument(
+        '--metrics-file',
+        type=Path,
+        help='Файл для метрик запуска в формате Prometheus'
+    )
     return parser
 
 
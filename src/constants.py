@@ -1,4 +1,5 @@
 import re
+from datetime import timedelta
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent
@@ -6,6 +7,36 @@ BASE_DIR = Path(__file__).parent
 MAIN_DOC_URL = 'https://docs.python.org/3/'
 PEP_DOC_URL = 'https://peps.python.org/'
 
+# Mode running every parser mode in one process
+ALL_MODES = 'all'
+# How long the cached pages of each mode are fresh; the stale pages
+# are revalidated with conditional requests
+MODE_EXPIRE_AFTER = {
+    'whats-new': timedelta(days=1),
+    'latest-versions': timedelta(hours=1),
+    'download': timedelta(days=1),
+    'pep': timedelta(hours=1),
+}
+# URL patterns with their own expiration, they take precedence over modes
+URLS_EXPIRE_AFTER = {
+    'docs.python.org/3/whatsnew/3.*': timedelta(days=7),
+    'peps.python.org/pep-*': timedelta(days=1),
+}
+
+# Name of the HTTP cache: the database file or the folder of the files,
+# and how many megabytes of responses it keeps by default
+CACHE_NAME = 'http_cache'
+CACHE_MAX_SIZE = 512
+# Accesses of the cached responses written to the database at once
+CACHE_TOUCH_BATCH = 100
+# Megabytes of the pages the modes of one run share in memory,
+# and the number of the index pages whose records they share
+PAGE_MEMO_SIZE = 32
+SHARED_RECORDS = 32
+
+# Address the results are served on by the --serve option
+SERVE_HOST = '127.0.0.1'
+
 # Recording time - Message level - Message
 LOG_FORMAT = '"%(asctime)s - [%(levelname)s] - %(message)s"'
 # Time formats
@@ -13,6 +44,46 @@ DT_FORMAT = '%d.%m.%Y %H:%M:%S'
 DATETIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
 
 LXML = 'lxml'
+# Number of threads fetching pages, and how many pages per thread
+# may be requested ahead of the parsing stage
+DEFAULT_WORKERS = 1
+PREFETCH_FACTOR = 2
+# Seconds to wait for the connection to a site and for the data
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+# Retries of a failed page, the pauses between them grow from the base
+# up to the maximum seconds, and each one is random up to its bound
+RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_BACKOFF_MAX = 10
+# Statuses of the answers worth requesting again
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Every request adds the share of a retry to the budget of the run,
+# which starts with the reserve, so the failing site is not flooded
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_RESERVE = 10
+# Requests per second and the burst of the token bucket of each host
+HOST_RATE = 10
+HOST_BURST = 10
+# Concurrent requests to each host: the limit starts at the first value
+# and grows by one for each round of good answers up to the maximum
+HOST_CONCURRENCY = 4
+HOST_CONCURRENCY_MAX = 32
+# The limit is cut by the factor, once per round, on the answers
+# of the overloaded host and on the latency exceeding the tolerance
+# times the usual one, which is smoothed with the weight of each answer
+THROTTLE_STATUSES = (429, 503)
+CONCURRENCY_DECREASE = 0.5
+LATENCY_TOLERANCE = 2
+LATENCY_WEIGHT = 0.1
+# Longest pause in seconds asked by Retry-After which is honoured
+RETRY_AFTER_MAX = 120
+# Threads sending the requests which are hedged
+HEDGE_THREADS = 16
+# Number of hosts the connection pools are kept for:
+# docs.python.org, peps.python.org and www.python.org with a spare one
+POOL_HOSTS = 4
+
 EXPECTED_STATUS = {
     'A': ('Active', 'Accepted'),
     'D': ('Deferred',),
@@ -28,8 +99,41 @@ EXPECTED_STATUS = {
 PYTHON_VERSION_STATUS = re.compile(
     r'Python (?P<version>\d\.\d+) \((?P<status>.*)\)'
 )
-# Pattern for finding a pdf file in a zip archive
-PDF_ZIP_LINK = re.compile(r'.+pdf-a4\.zip$')
+# Pattern for finding the zip archive of each format of the documentation
+ARTIFACT_ZIP_LINK = re.compile(r'.+docs-(?P<artifact>[\w-]+)\.zip$')
+# Size of the chunks the archive is written with
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Connections the archive is downloaded over and the size of its byte
+# ranges, the smaller archive comes in a single stream
+DOWNLOAD_CONNECTIONS = 4
+DOWNLOAD_PART_SIZE = 8 * 2**20
+# Headers the server may give the checksum of the file in
+DIGEST_HEADERS = ('Repr-Digest', 'Digest')
+# Folder in "downloads" keeping each content once under its SHA-256,
+# the downloaded files are hardlinks to it
+OBJECTS_DIR = 'objects'
+# Quantiles of the fetch latency in the run summary and the metric names
+LATENCY_QUANTILES = (0.5, 0.9, 0.99)
+METRICS_PREFIX = 'bs4_parser'
+# File in the "state" folder with the records of the pep documents
+PEP_STATE_FILE = 'pep.json'
+# File in the "shards" folder with the partial results of a pep shard
+PEP_SHARD_FILE = 'pep-{index}-of-{count}.json'
+# File in the "state" folder with the records extracted from the pages
+EXTRACTIONS_FILE = 'extractions.sqlite3'
+# Records stored between the commits of the extractions, so the write
+# lock is held only briefly and the broken run keeps what it has stored
+EXTRACTIONS_BATCH = 50
+# Database in the "db" folder with the results of all the runs,
+# and how many days of them the status history covers
+RESULTS_DB_FILE = 'results.sqlite3'
+RESULTS_HISTORY_DAYS = 90
+# Confidence of the interval of the mismatch rate estimated
+# from the sample of the pep pages, and its z-score
+CONFIDENCE = 0.95
+CONFIDENCE_Z = 1.96
+# First cell of the last pep row with the number of all documents
+PEP_TOTAL = 'Total'
 
 LINK_HEADER_EDITOR = 3
 STATUS_QUANTITY = 3
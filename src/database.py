@@ -0,0 +1,110 @@
+import datetime as dt
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable, Optional
+
+from constants import RESULTS_HISTORY_DAYS
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    mode TEXT NOT NULL,
+    started_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_mode_started ON runs (mode, started_at);
+
+CREATE TABLE IF NOT EXISTS whats_new (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    url TEXT NOT NULL,
+    title TEXT,
+    editors TEXT,
+    PRIMARY KEY (run_id, url)
+);
+CREATE INDEX IF NOT EXISTS whats_new_url ON whats_new (url);
+
+CREATE TABLE IF NOT EXISTS latest_versions (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    url TEXT NOT NULL,
+    version TEXT,
+    status TEXT,
+    PRIMARY KEY (run_id, url)
+);
+CREATE INDEX IF NOT EXISTS latest_versions_url ON latest_versions (url);
+CREATE INDEX IF NOT EXISTS latest_versions_status
+    ON latest_versions (status);
+
+CREATE TABLE IF NOT EXISTS pep (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    status TEXT NOT NULL,
+    quantity INTEGER,
+    PRIMARY KEY (run_id, status)
+);
+CREATE INDEX IF NOT EXISTS pep_status ON pep (status);
+'''
+# Table of each mode with its key and the columns of the rows
+MODE_TABLES = {
+    'whats-new': ('whats_new', ('url',), ('url', 'title', 'editors')),
+    'latest-versions': (
+        'latest_versions', ('url',), ('url', 'version', 'status')
+    ),
+    'pep': ('pep', ('status',), ('status', 'quantity')),
+}
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Opens the database of the results, creating the tables if needed."""
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def upsert_query(mode: str) -> str:
+    """Query inserting a row of the run, the repeated key replaces it."""
+    table, key, columns = MODE_TABLES[mode]
+    updates = ', '.join(
+        f'{column} = excluded.{column}'
+        for column in columns if column not in key
+    )
+    return (
+        f'INSERT INTO {table} (run_id, {", ".join(columns)}) '
+        f'VALUES (?, {", ".join("?" * len(columns))}) '
+        f'ON CONFLICT (run_id, {", ".join(key)}) DO UPDATE SET {updates}'
+    )
+
+
+def save_run(
+        path: Path,
+        mode: str,
+        rows: Iterable[tuple],
+        started_at: Optional[dt.datetime] = None
+) -> int:
+    """Saves the rows of the run in one transaction and returns its id.
+    The rows have to be collected already, the transaction holds
+    the write lock of the database until they are all inserted."""
+    started_at = started_at or dt.datetime.now()
+    with closing(connect(path)) as connection, connection:
+        run_id = connection.execute(
+            'INSERT INTO runs (mode, started_at) VALUES (?, ?)',
+            (mode, started_at.isoformat(timespec='seconds'))
+        ).lastrowid
+        connection.executemany(
+            upsert_query(mode), ((run_id, *row) for row in rows)
+        )
+    return run_id
+
+
+def status_counts(
+        path: Path, days: int = RESULTS_HISTORY_DAYS
+) -> list[tuple[str, str, int]]:
+    """Numbers of the pep documents of each status for the runs
+    of the last days, as the date of the run, status and quantity."""
+    since = dt.datetime.now() - dt.timedelta(days=days)
+    with closing(connect(path)) as connection:
+        return connection.execute(
+            'SELECT runs.started_at, pep.status, pep.quantity '
+            'FROM runs JOIN pep ON pep.run_id = runs.id '
+            'WHERE runs.mode = ? AND runs.started_at >= ? '
+            'ORDER BY runs.started_at, pep.status',
+            ('pep', since.isoformat(timespec='seconds'))
+        ).fetchall()
@@ -0,0 +1,350 @@
+import base64
+import binascii
+import hashlib
+import logging
+import mmap
+import os
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+
+from requests import RequestException, Response
+from requests.structures import CaseInsensitiveDict
+from requests_cache import CachedSession
+
+from constants import (DIGEST_HEADERS, DOWNLOAD_CHUNK_SIZE,
+                       DOWNLOAD_CONNECTIONS, DOWNLOAD_PART_SIZE)
+from exceptions import DownloadException
+from metrics import collector
+from retries import request_policy
+from utils import thread_session
+
+
+class RemoteFile(NamedTuple):
+    """What the server tells about the file before it is downloaded."""
+    size: int = 0
+    etag: str = ''
+    ranges: bool = False
+    # Hex SHA-256 of the file, if the server gives it
+    digest: Optional[str] = None
+
+
+def part_path(path: Path) -> Path:
+    """Path of the temporary file the download is written into."""
+    return path.with_name(path.name + '.part')
+
+
+def etag_path(path: Path) -> Path:
+    """Path of the file keeping the ETag of the downloaded file."""
+    return path.with_name(path.name + '.etag')
+
+
+def read_etag(path: Path) -> Optional[str]:
+    try:
+        return etag_path(path).read_text(encoding='utf-8')
+    except OSError:
+        return None
+
+
+def remote_info(session: CachedSession, url: str) -> RemoteFile:
+    """Size, ETag, support of the ranges and checksum of the remote file,
+    HEAD request is enough for this. Returns zero size and an empty ETag
+    if the server does not tell."""
+    try:
+        response = session.head(
+            url, allow_redirects=True, timeout=request_policy(session).timeout
+        )
+        response.raise_for_status()
+    except RequestException:
+        logging.warning(f'Could not get the file info -> {url}')
+        return RemoteFile()
+    headers = response.headers
+    return RemoteFile(
+        size=int(headers.get('Content-Length', 0)),
+        etag=headers.get('ETag', ''),
+        ranges=headers.get('Accept-Ranges', '').lower() == 'bytes',
+        digest=header_digest(headers)
+    )
+
+
+def header_digest(headers: CaseInsensitiveDict) -> Optional[str]:
+    """Hex SHA-256 from the Repr-Digest or the Digest header."""
+    for name in DIGEST_HEADERS:
+        for item in headers.get(name, '').split(','):
+            algorithm, _, value = item.strip().partition('=')
+            if algorithm.lower() != 'sha-256':
+                continue
+            try:
+                # Repr-Digest wraps the value in colons
+                return base64.b64decode(value.strip(':'), validate=True).hex()
+            except binascii.Error:
+                return None
+    return None
+
+
+def file_digest(path: Path) -> str:
+    """Hex SHA-256 of the file. The file is mapped into memory,
+    so it is hashed without being copied in chunks."""
+    with open(path, 'rb') as file:
+        if not os.fstat(file.fileno()).st_size:
+            # The empty file can not be mapped
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+def is_up_to_date(path: Path, size: int, etag: str) -> bool:
+    """Checks if the local file matches the remote size and ETag."""
+    if not path.exists() or not (size or etag):
+        return False
+    if size and path.stat().st_size != size:
+        return False
+    return not etag or read_etag(path) == etag
+
+
+def stream_download(
+        session: CachedSession,
+        url: str,
+        path: Path,
+        connections: int = 1,
+        part_size: int = DOWNLOAD_PART_SIZE
+) -> bool:
+    """Downloads the file in chunks bypassing the cache.
+    The chunks are written into a temporary file, which replaces the
+    target file at the end. With several connections the file larger
+    than a part is fetched in byte ranges at once, if the server
+    accepts the ranges; otherwise it comes in a single stream and the
+    interrupted download is resumed with the Range header.
+    The file is checked against the size, ETag and checksum the server
+    gives, and the zip archive against the CRCs of its members.
+    Returns False if the local file is up to date."""
+    with session.cache_disabled():
+        remote = remote_info(session, url)
+        if is_up_to_date(path, remote.size, remote.etag):
+            logging.info(f'The file is up to date -> {path}')
+            return False
+        temp_path = part_path(path)
+        try:
+            if connections > 1 and remote.ranges and remote.size > part_size:
+                ranged_download(
+                    session, url, temp_path, remote, connections, part_size
+                )
+            else:
+                single_download(session, url, temp_path, remote.etag)
+        except RequestException:
+            error_msg = f'The download has been interrupted -> {url}'
+            logging.exception(error_msg, stack_info=True)
+            raise DownloadException(error_msg)
+    verify_file(temp_path, remote)
+    os.replace(temp_path, path)
+    os.replace(etag_path(temp_path), etag_path(path))
+    return True
+
+
+def download_files(
+        session: CachedSession,
+        files: dict[str, Path],
+        workers: int = 1,
+        connections: int = 1
+) -> Iterator[Path]:
+    """Downloads the files by the URLs at once, each one by its worker.
+    Yields the paths of the files downloaded anew as they complete.
+    The failed file is logged and recorded, the others go on."""
+    executor = ThreadPoolExecutor(max_workers=max(min(workers, len(files)), 1))
+    try:
+        futures = {
+            executor.submit(
+                stream_download, thread_session(session), url, path,
+                connections
+            ): url
+            for url, path in files.items()
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                downloaded = future.result()
+            except DownloadException as error:
+                logging.error(f'The file has not been downloaded -> {url}')
+                collector.record_failure(url, str(error))
+                continue
+            if downloaded:
+                yield files[url]
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def single_download(
+        session: CachedSession, url: str, temp_path: Path, etag: str
+) -> None:
+    """Streams the file over one connection, resuming the partial one.
+    Without an ETag the partial file may belong to another version
+    of the file, so it is downloaded from the start."""
+    offset = temp_path.stat().st_size if temp_path.exists() else 0
+    headers = {}
+    if etag and offset and read_etag(temp_path) == etag:
+        # The server sends the whole file if it has changed
+        headers['Range'] = f'bytes={offset}-'
+        headers['If-Range'] = etag
+    # The read timeout bounds the wait for each of the chunks
+    timeout = request_policy(session).timeout
+    response = session.get(url, headers=headers, stream=True, timeout=timeout)
+    if response.status_code == 416:
+        # The partial file does not fit the remote file anymore,
+        # the unread answer is closed to free the connection
+        response.close()
+        response = session.get(url, stream=True, timeout=timeout)
+    response.raise_for_status()
+    write_chunks(response, temp_path, etag)
+
+
+def ranged_download(
+        session: CachedSession,
+        url: str,
+        temp_path: Path,
+        remote: RemoteFile,
+        connections: int = DOWNLOAD_CONNECTIONS,
+        part_size: int = DOWNLOAD_PART_SIZE
+) -> None:
+    """Fetches the byte ranges of the file over several connections.
+    The file is preallocated and each part is written in place.
+    The ETag is saved only when all the parts are written,
+    so a broken ranged download is never resumed as a stream."""
+    etag_path(temp_path).unlink(missing_ok=True)
+    with open(temp_path, 'wb') as file:
+        file.truncate(remote.size)
+    parts = [
+        (start, min(start + part_size, remote.size) - 1)
+        for start in range(0, remote.size, part_size)
+    ]
+    logging.info(
+        f'Downloading {len(parts)} parts over {connections} connections '
+        f'-> {temp_path}'
+    )
+    executor = ThreadPoolExecutor(max_workers=connections)
+    try:
+        # Every worker has its own lock of the session
+        futures = [
+            executor.submit(
+                fetch_part, thread_session(session), url, temp_path,
+                remote.etag, start, end
+            )
+            for start, end in parts
+        ]
+        for future in as_completed(futures):
+            future.result()
+    finally:
+        # The first failed part stops the parts not sent yet
+        executor.shutdown(cancel_futures=True)
+    etag_path(temp_path).write_text(remote.etag, encoding='utf-8')
+
+
+def fetch_part(
+        session: CachedSession,
+        url: str,
+        temp_path: Path,
+        etag: str,
+        start: int,
+        end: int
+) -> None:
+    """Writes the byte range of the file, retrying the broken requests."""
+    policy = request_policy(session)
+    headers = {'Range': f'bytes={start}-{end}'}
+    if etag:
+        # The changed file is sent whole and is rejected below
+        headers['If-Range'] = etag
+    for attempt in range(policy.retries + 1):
+        try:
+            response = session.get(
+                url, headers=headers, stream=True, timeout=policy.timeout
+            )
+            with closing(response):
+                response.raise_for_status()
+                write_part(response, temp_path, etag, start, end)
+            return
+        except RequestException:
+            if attempt == policy.retries:
+                raise
+            collector.record_retry()
+            time.sleep(policy.backoff(attempt))
+
+
+def write_part(
+        response: Response, temp_path: Path, etag: str, start: int, end: int
+) -> None:
+    content_range = response.headers.get('Content-Range', '')
+    if (
+            response.status_code != 206
+            or content_range.partition('/')[0] != f'bytes {start}-{end}'
+            or response.headers.get('ETag', etag) != etag
+    ):
+        error_msg = (
+            f'The part {start}-{end} has not been sent, '
+            f'the file may have changed -> {response.url}'
+        )
+        logging.error(error_msg)
+        raise DownloadException(error_msg)
+    with open(temp_path, 'r+b') as file:
+        file.seek(start)
+        write_body(response, file)
+        written = file.tell() - start
+    if written != end + 1 - start:
+        error_msg = f'The part {start}-{end} is incomplete -> {response.url}'
+        logging.error(error_msg)
+        raise DownloadException(error_msg)
+
+
+def is_broken_zip(path: Path) -> bool:
+    """Whether the zip archive is unreadable or has a member
+    whose content does not match its CRC."""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return archive.testzip() is not None
+    except (zipfile.BadZipFile, zlib.error, EOFError):
+        return True
+
+
+def verify_file(temp_path: Path, remote: RemoteFile) -> None:
+    """Checks the assembled file against the size and the checksum.
+    The server may give neither of them, so the zip archive is also
+    checked against the CRCs of its members, which always runs.
+    The broken file is removed, so the next run starts it anew."""
+    error_msg = None
+    # The temporary file is named after the target one with ".part"
+    is_zip = Path(temp_path.stem).suffix == '.zip'
+    if remote.size and temp_path.stat().st_size != remote.size:
+        error_msg = f'The size of the file does not match -> {temp_path}'
+    elif remote.digest and file_digest(temp_path) != remote.digest:
+        error_msg = f'The checksum of the file does not match -> {temp_path}'
+    elif is_zip and is_broken_zip(temp_path):
+        error_msg = f'The archive is broken -> {temp_path}'
+    if error_msg is not None:
+        temp_path.unlink()
+        etag_path(temp_path).unlink(missing_ok=True)
+        logging.error(error_msg)
+        raise DownloadException(error_msg)
+
+
+def write_chunks(response: Response, temp_path: Path, etag: str) -> None:
+    """Appends the partial content, otherwise rewrites the file."""
+    resumed = response.status_code == 206
+    if resumed:
+        logging.info(f'Resuming the download -> {temp_path}')
+    etag_path(temp_path).write_text(etag, encoding='utf-8')
+    # Recording is done in binary mode
+    with open(temp_path, 'ab' if resumed else 'wb') as file:
+        write_body(response, file)
+
+
+def write_body(response: Response, file: BinaryIO) -> None:
+    """Writes the streamed body in chunks, the bytes received
+    are counted as they came over the network."""
+    received = 0
+    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+        file.write(chunk)
+        size = response.raw.tell() or received + len(chunk)
+        collector.add_bytes(size - received)
+        received = size
@@ -0,0 +1,18 @@
+from enum import Enum
+
+from utils import enum_values
+
+
+class Artifact(str, Enum):
+    PDF_LETTER = 'pdf-letter'
+    PDF_A4 = 'pdf-a4'
+    HTML = 'html'
+    TEXT = 'text'
+    EPUB = 'epub'
+
+    @classmethod
+    @property
+    def to_display(cls):
+        """Returns 'pdf-letter', 'pdf-a4', 'html', 'text' and 'epub'
+        documentation archives"""
+        return enum_values(cls)
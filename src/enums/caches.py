@@ -0,0 +1,26 @@
+from enum import Enum
+
+from utils import enum_values
+
+
+class CacheBackend(str, Enum):
+    SQLITE = 'sqlite'
+    FILESYSTEM = 'filesystem'
+    MEMORY = 'memory'
+
+    @classmethod
+    @property
+    def to_display(cls):
+        """Returns 'sqlite', 'filesystem' and 'memory' cache backends"""
+        return enum_values(cls)
+
+
+class CacheAction(str, Enum):
+    CLEAR = 'clear'
+    COMPACT = 'compact'
+
+    @classmethod
+    @property
+    def to_display(cls):
+        """Returns 'clear' and 'compact' cache actions"""
+        return enum_values(cls)
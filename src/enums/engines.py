@@ -0,0 +1,14 @@
+from enum import Enum
+
+from utils import enum_values
+
+
+class Engine(str, Enum):
+    BS4 = 'bs4'
+    LXML = 'lxml'
+
+    @classmethod
+    @property
+    def to_display(cls):
+        """Returns 'bs4' and 'lxml' extraction engines"""
+        return enum_values(cls)
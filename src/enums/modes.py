@@ -6,9 +6,10 @@ from utils import enum_values
 class AdditionalMode(str, Enum):
     PRETTY = 'pretty'
     FILE = 'file'
+    SQLITE = 'sqlite'
 
     @classmethod
     @property
     def to_display(cls):
-        """Returns 'pretty' and 'file' modes"""
+        """Returns 'pretty', 'file' and 'sqlite' modes"""
         return enum_values(cls)
@@ -0,0 +1,14 @@
+from enum import Enum
+
+from utils import enum_values
+
+
+class SessionType(str, Enum):
+    SYNC = 'sync'
+    ASYNC = 'async'
+
+    @classmethod
+    @property
+    def to_display(cls):
+        """Returns 'sync' and 'async' session types"""
+        return enum_values(cls)
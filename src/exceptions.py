@@ -11,3 +11,13 @@ class FindVersionsException(Exception):
 class NoneResponseException(Exception):
     """Called when response is absent."""
     pass
+
+
+class DownloadException(Exception):
+    """Called when the file download is interrupted."""
+    pass
+
+
+class ShardsException(Exception):
+    """Called when the outputs of the shards cannot be merged."""
+    pass
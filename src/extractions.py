@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import logging
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from functools import lru_cache
+from pathlib import Path
+from typing import (TYPE_CHECKING, Callable, Iterable, Iterator, Optional,
+                    TypeVar)
+
+from constants import EXTRACTIONS_BATCH
+from exceptions import ParserFindTagException
+from metrics import collector
+from state import content_hash
+
+if TYPE_CHECKING:
+    from requests import Response
+
+Record = TypeVar('Record')
+
+
+@lru_cache(maxsize=None)
+def source_version(function: Callable) -> str:
+    """Hash of the source of the module the function is defined in,
+    so any change of the extraction code gives a new version."""
+    function = inspect.unwrap(function)
+    source = Path(inspect.getsourcefile(function)).read_bytes()
+    return hashlib.sha256(
+        source + function.__qualname__.encode()
+    ).hexdigest()
+
+
+def extractor_version(extractor: Callable) -> str:
+    # The options bound with partial() do not change the records
+    return source_version(getattr(extractor, 'func', extractor))
+
+
+def timed_extract(
+        extractor: Callable[[str], Record], markup: str
+) -> tuple[Record, float]:
+    """Record of the page with the seconds it took, the time spent
+    in a worker process is added to the parse phase by the parent."""
+    start = time.perf_counter()
+    record = extractor(markup)
+    return record, time.perf_counter() - start
+
+
+def parse_failure(url: str, error: Exception) -> None:
+    """The page the mode goes on without, it lacks the tags sought."""
+    logging.error(f'Error occurred while parsing the page -> {url}: {error}')
+    collector.record_failure(url, f'{type(error).__name__}: {error}')
+
+
+class ExtractionCache:
+    """Records extracted from the pages, stored with the URL,
+    the hash of the page body and the version of the extractor.
+
+    The unchanged page gives its stored record without being parsed.
+    Without a path nothing is stored and every page is parsed.
+    The records are committed in batches of the given size."""
+
+    def __init__(
+            self,
+            path: Optional[Path] = None,
+            batch: int = EXTRACTIONS_BATCH
+    ) -> None:
+        self.connection = None
+        self.batch = batch
+        self.uncommitted = 0
+        if path is not None:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS extractions ('
+                'url TEXT PRIMARY KEY, hash TEXT, version TEXT, record TEXT)'
+            )
+
+    def find(
+            self, extractor: Callable[[str], Record], response: Response
+    ) -> tuple[Optional[tuple], Optional[Record]]:
+        """Key of the page and its stored record, None if there is none."""
+        if self.connection is None:
+            return None, None
+        key = (
+            response.url,
+            content_hash(response.content),
+            extractor_version(extractor)
+        )
+        row = self.connection.execute(
+            'SELECT record FROM extractions '
+            'WHERE url = ? AND hash = ? AND version = ?', key
+        ).fetchone()
+        if row is None:
+            return key, None
+        record = json.loads(row[0])
+        # JSON gives the tuples of the records back as lists
+        return key, tuple(record) if isinstance(record, list) else record
+
+    def store(self, key: Optional[tuple], record: Record) -> None:
+        # Only the last record of each page is kept
+        if self.connection is None:
+            return
+        self.connection.execute(
+            'INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?)',
+            (*key, json.dumps(record, ensure_ascii=False))
+        )
+        self.uncommitted += 1
+        if self.uncommitted >= self.batch:
+            self.commit()
+
+    def commit(self) -> None:
+        self.connection.commit()
+        self.uncommitted = 0
+
+    def extract(
+            self, extractor: Callable[[str], Record], response: Response
+    ) -> Optional[Record]:
+        """Record of the page, None if the page lacks its tags."""
+        key, record = self.find(extractor, response)
+        if record is None:
+            try:
+                record = extractor(response.text)
+            except ParserFindTagException as error:
+                return parse_failure(response.url, error)
+            self.store(key, record)
+        return record
+
+    def extract_all(
+            self,
+            extractor: Callable[[str], Record],
+            responses: Iterable[Optional[Response]],
+            executor: Optional[Executor] = None,
+            ahead: int = 1
+    ) -> Iterator[Optional[Record]]:
+        """Records of the pages in their order, None for the pages which
+        have failed to load or lack their tags. The pages missing from
+        the cache are parsed by the pool of processes, up to ahead pages
+        at once; only the page text goes to it and only the record with
+        its parse time comes back."""
+        if executor is None:
+            for response in responses:
+                yield None if response is None else self.extract(
+                    extractor, response
+                )
+            return
+        pending = deque()
+        try:
+            for response in responses:
+                url = key = record = None
+                if response is not None:
+                    url = response.url
+                    key, record = self.find(extractor, response)
+                    if record is None:
+                        record = executor.submit(
+                            timed_extract, extractor, response.text
+                        )
+                pending.append((url, key, record))
+                if len(pending) >= ahead:
+                    yield self._resolve(*pending.popleft())
+            while pending:
+                yield self._resolve(*pending.popleft())
+        finally:
+            for _, _, record in pending:
+                if isinstance(record, Future):
+                    record.cancel()
+
+    def _resolve(
+            self, url: Optional[str], key: Optional[tuple], record
+    ) -> Optional[Record]:
+        if isinstance(record, Future):
+            try:
+                record, seconds = record.result()
+            except ParserFindTagException as error:
+                return parse_failure(url, error)
+            collector.add_time('parse', seconds)
+            self.store(key, record)
+        return record
+
+    def close(self) -> None:
+        """Saves the records of the last batch."""
+        if self.connection is not None:
+            self.commit()
+            self.connection.close()
+            self.connection = None
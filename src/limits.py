@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Optional
+
+from constants import (CONCURRENCY_DECREASE, HOST_BURST, HOST_CONCURRENCY,
+                       HOST_CONCURRENCY_MAX, HOST_RATE, LATENCY_TOLERANCE,
+                       LATENCY_WEIGHT, RETRY_AFTER_MAX, THROTTLE_STATUSES)
+
+if TYPE_CHECKING:
+    from requests import Response
+
+
+def retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds of the Retry-After header, given as seconds or as date."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = (date - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+
+class HostLimiter:
+    """Throttle of the requests to one host.
+
+    The token bucket keeps the rate of the requests, and the limit
+    of the concurrent requests adapts to the host (AIMD): it grows
+    by one for each round of good answers and is cut by a factor
+    on 429/503, on the failed requests and on the latency far above
+    the usual one. Retry-After holds every request to the host.
+    Only the requests going to the host take a token, the pages
+    answered from the cache do not pass the throttle at all.
+    """
+
+    def __init__(
+            self,
+            rate: float = HOST_RATE,
+            burst: int = HOST_BURST,
+            concurrency: int = HOST_CONCURRENCY,
+            max_concurrency: int = HOST_CONCURRENCY_MAX
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.max_limit = max_concurrency
+        self.limit = float(min(concurrency, max_concurrency))
+        self.active = 0
+        self.latency = None
+        self.blocked_until = 0.0
+        self._refilled = time.monotonic()
+        self._decreased = float('-inf')
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Waits for a token and a free place among the requests."""
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                pause = self.blocked_until - now
+                if pause <= 0 and self.active < max(int(self.limit), 1):
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.active += 1
+                        return
+                    pause = (1 - self.tokens) / self.rate
+                # The full host is waited for until a request is released
+                self._condition.wait(pause if pause > 0 else None)
+
+    def release(self, response: Optional[Response], seconds: float) -> None:
+        """Adapts the limit to the answer, None for the failed request."""
+        with self._condition:
+            self.active -= 1
+            now = time.monotonic()
+            if response is None:
+                self._decrease(now)
+            elif response.status_code in THROTTLE_STATUSES:
+                pause = retry_after(response.headers.get('Retry-After'))
+                if pause:
+                    self.blocked_until = max(self.blocked_until, now + pause)
+                self._decrease(now)
+            else:
+                if (self.latency is not None
+                        and seconds > LATENCY_TOLERANCE * self.latency):
+                    self._decrease(now)
+                else:
+                    # One more request for each round of the answers
+                    self.limit = min(
+                        self.limit + 1 / self.limit, self.max_limit
+                    )
+                self.latency = seconds if self.latency is None else (
+                    LATENCY_WEIGHT * seconds
+                    + (1 - LATENCY_WEIGHT) * self.latency
+                )
+            self._condition.notify_all()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.tokens + (now - self._refilled) * self.rate, self.burst
+        )
+        self._refilled = now
+
+    def _decrease(self, now: float) -> None:
+        # The answers of one round tell about the same overload
+        if now - self._decreased < (self.latency or 0):
+            return
+        self._decreased = now
+        self.limit = max(self.limit * CONCURRENCY_DECREASE, 1.0)
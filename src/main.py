@@ -1,130 +1,421 @@
-import logging
-import re
+from __future__ import annotations
 
-from bs4 import BeautifulSoup
-from requests_cache import CachedSession
-from tqdm import tqdm
+import logging
+from argparse import Namespace
+from contextlib import closing, nullcontext
+from datetime import timedelta
+from functools import partial
+from operator import attrgetter
+from http import HTTPStatus
+from importlib import import_module
+from pathlib import Path
+from types import ModuleType
+from typing import (TYPE_CHECKING, Callable, ContextManager, Iterable,
+                    Iterator, Optional)
 from urllib.parse import urljoin
 
 from configs import configure_argument_parser, configure_logging
-from constants import (BASE_DIR, EXPECTED_STATUS, LXML, MAIN_DOC_URL,
-                       PDF_ZIP_LINK, PEP_DOC_URL, PYTHON_VERSION_STATUS)
+from constants import (ALL_MODES, BASE_DIR, CACHE_NAME, CONFIDENCE,
+                       DEFAULT_WORKERS, DOWNLOAD_CONNECTIONS, EXPECTED_STATUS,
+                       EXTRACTIONS_FILE, MAIN_DOC_URL, MODE_EXPIRE_AFTER,
+                       OBJECTS_DIR, PAGE_MEMO_SIZE, PEP_DOC_URL,
+                       PEP_SHARD_FILE, PEP_STATE_FILE, PEP_TOTAL,
+                       PREFETCH_FACTOR, URLS_EXPIRE_AFTER)
+from enums.artifacts import Artifact
+from enums.caches import CacheAction
+from enums.engines import Engine
 from enums.headers import Header
-from exceptions import FindVersionsException
+from enums.sessions import SessionType
+from metrics import collector
 from outputs import control_output
-from utils import find_tag, get_response, is_none, mkdir_and_path
+from records import Article, PepLink, StatusQuantity
+from retries import RequestPolicy
+from sampling import stratified_sample, wilson_interval
+from shards import in_shard, merge_shards, save_shard
+from state import (conditional_headers, content_hash, load_state,
+                   make_record, save_state)
+from utils import (get_response, get_responses, is_none, mkdir_and_path,
+                   streamable)
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    # The heavy dependencies are imported by the modes which use them,
+    # so the help and the argument errors are shown without them
+    from requests import Response
+    from requests_cache import CachedSession
+
+    from extractions import ExtractionCache
+
+# Modules extracting the data from the pages with each engine
+ENGINES = {
+    Engine.BS4: 'parsers.soup',
+    Engine.LXML: 'parsers.xpath',
+}
+
+
+def load_parser(engine: str) -> ModuleType:
+    """Imports the module of the engine on the first use."""
+    return import_module(ENGINES[engine])
 
 
-def whats_new(session: CachedSession) -> list[tuple[str, str, str]]:
+@streamable
+def whats_new(
+        session: CachedSession,
+        workers: int = DEFAULT_WORKERS,
+        engine: str = Engine.BS4,
+        full_parse: bool = False,
+        extraction_cache: bool = False,
+        processes: Optional[int] = None
+) -> Iterator[tuple[str, str, str]]:
     """Collects links to articles about innovations in Python
     and information about the authors and editors of articles."""
+    from tqdm import tqdm
+
+    parser = load_parser(engine)
     whats_new_url = urljoin(MAIN_DOC_URL, 'whatsnew/')
     response = is_none(get_response(session, whats_new_url))
-    results = [Header.first_row, ]  # Set the list where we will save the data
-    soup = BeautifulSoup(response.text, LXML)
-    main_div = find_tag(soup, 'div', {'class': 'toctree-wrapper'})
-    li_tags = main_div.find_all('li', class_='toctree-l1')
-    for li in tqdm(li_tags):
-        # The first tag <a> has the hyper reference we are looking for
-        tag_a = find_tag(li, 'a')
-        href = tag_a.get('href')
-        url = urljoin(whats_new_url, href)
-        # Collecting information from the desired page
-        response = is_none(get_response(session, url))
-        soup = BeautifulSoup(response.text, LXML)
-        python_version = find_tag(soup, 'h1').text
-        editors = find_tag(soup, 'dl').text.replace('\n', ' ')
-        results.append((url, python_version, editors))
-    return results
-
-
-def latest_versions(session: CachedSession) -> list[tuple[str, str, str]]:
+    yield Header.first_row
+    urls = [
+        urljoin(whats_new_url, href)
+        for href in parser.whats_new_links(response.text, full_parse)
+    ]
+    # The articles which have failed to load are left out
+    responses = get_responses(session, urls, workers)
+    article = partial(parser.whats_new_article, full_parse=full_parse)
+    with closing(open_extractions(extraction_cache)) as extractions, \
+            parse_pool(processes) as executor:
+        # Collecting information from the desired pages
+        articles = extractions.extract_all(
+            article, responses, executor, parse_ahead(processes)
+        )
+        with closing(articles):
+            for url, record in tqdm(zip(urls, articles), total=len(urls)):
+                if record is not None:
+                    yield Article(url, *record)
+
+
+@streamable
+def latest_versions(
+        session: CachedSession,
+        engine: str = Engine.BS4,
+        full_parse: bool = False
+) -> Iterator[tuple[str, str, str]]:
     """Gathers information about Python version statuses."""
     response = is_none(get_response(session, MAIN_DOC_URL))
-    results = [Header.first_row, ]  # Set the list where we will save the data
-    soup = BeautifulSoup(response.text, LXML)
-    sidebar = find_tag(soup, 'div', {'class': 'sphinxsidebarwrapper'})
-    ul_tags = sidebar.find_all('ul')
-    for ul in ul_tags:
-        if 'All versions' not in ul.text and ul == ul_tags[-1]:
-            raise FindVersionsException('List of Python versions not found!')
-        if 'All versions' in ul.text:
-            a_tags = ul.find_all('a')
-            # If the required list is not found,
-            # the program is interrupted and exception is raised
-            break
-    for a_tag in a_tags:
-        link = a_tag.get('href')
-        # Search for pattern matching in the a_tag
-        text_match = re.search(PYTHON_VERSION_STATUS, a_tag.text)
-        if text_match is not None:
-            version, status = text_match.groups()
-        else:
-            version, status = a_tag.text, ''
-        results.append((link, version, status))
-    return results
+    yield Header.first_row
+    yield from load_parser(engine).version_links(response.text, full_parse)
 
 
-def download(session: CachedSession) -> None:
-    """Downloads archive with up-to-date documentation."""
+def download(
+        session: CachedSession,
+        engine: str = Engine.BS4,
+        full_parse: bool = False,
+        connections: int = DOWNLOAD_CONNECTIONS,
+        artifacts: Iterable[str] = (Artifact.PDF_A4,),
+        workers: int = DEFAULT_WORKERS
+) -> None:
+    """Downloads archives of the chosen formats with up-to-date
+    documentation at once, the large archive in byte ranges
+    over several connections. Each content is stored once,
+    the archives with the same content are hardlinks to it."""
+    from downloads import download_files
+    from store import prune_store, store_file
+
     downloads_url = urljoin(MAIN_DOC_URL, 'download.html')
     response = is_none(get_response(session, downloads_url))
-    soup = BeautifulSoup(response.text, LXML)
-    table_tag = find_tag(soup, 'table', attrs={'class': 'docutils'})
-    # compile() takes a string and returns a regular expression object.
-    pdf_a4_tag = find_tag(table_tag, 'a', {'href': PDF_ZIP_LINK})
-    pdf_a4_link = pdf_a4_tag.get('href')
-    archive_url = urljoin(downloads_url, pdf_a4_link)
-    # Filename formed from the last element of the "archive_url"
-    filename = archive_url.split('/')[-1]
-    archive_path = mkdir_and_path(BASE_DIR, 'downloads', filename)
-    # Downloading archive
-    response = is_none(get_response(session, archive_url))
-    # Recording is done in binary mode ('wb')
-    with open(archive_path, 'wb') as file:
-        file.write(response.content)
-    logging.info(f'The archive has been downloaded -> {archive_path}')
-
-
-def pep(session: CachedSession) -> list[tuple[str, str]]:
+    links = load_parser(engine).artifact_links(response.text, full_parse)
+    files = {}
+    for artifact in map(Artifact, artifacts):
+        if artifact.value not in links:
+            logging.warning(f'There is no archive of the format -> {artifact}')
+            continue
+        archive_url = urljoin(downloads_url, links[artifact.value])
+        # Filename formed from the last element of the "archive_url"
+        filename = archive_url.split('/')[-1]
+        files[archive_url] = mkdir_and_path(BASE_DIR, 'downloads', filename)
+    objects_dir = BASE_DIR / 'downloads' / OBJECTS_DIR
+    # Downloading archives in chunks, the unchanged archives are skipped
+    for archive_path in download_files(session, files, workers, connections):
+        if store_file(objects_dir, archive_path):
+            logging.info(
+                f'The archive has the content stored already -> '
+                f'{archive_path}'
+            )
+        logging.info(f'The archive has been downloaded -> {archive_path}')
+    prune_store(objects_dir)
+
+
+def open_extractions(enabled: bool) -> ExtractionCache:
+    """Cache of the records extracted from the pages, if it is enabled."""
+    from extractions import ExtractionCache
+
+    if not enabled:
+        return ExtractionCache()
+    return ExtractionCache(
+        mkdir_and_path(BASE_DIR, 'state', EXTRACTIONS_FILE)
+    )
+
+
+def parse_pool(processes: Optional[int]) -> ContextManager[Optional[Executor]]:
+    """Pool of processes parsing the pages, without it
+    the pages are parsed in the main process.
+    The processes are started afresh rather than forked: they are
+    created on the first page, when the fetch threads already run and
+    may hold the locks the forked copy would wait on forever."""
+    if not processes:
+        return nullcontext()
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn')
+    )
+
+
+def parse_ahead(processes: Optional[int]) -> int:
+    # Enough pages are sent to keep every process busy
+    return (processes or 1) * PREFETCH_FACTOR
+
+
+def pep_statuses(
+        session: CachedSession,
+        urls: list[str],
+        workers: int,
+        extractions: ExtractionCache,
+        parse_status: Callable[[str], str],
+        processes: Optional[int] = None
+) -> Iterator[Optional[str]]:
+    """Extracts the statuses from the pages of the pep documents,
+    None for the documents which have failed to load."""
+    responses = get_responses(session, urls, workers)
+    with parse_pool(processes) as executor:
+        yield from extractions.extract_all(
+            parse_status, responses, executor, parse_ahead(processes)
+        )
+
+
+def incremental_pep_statuses(
+        session: CachedSession,
+        urls: list[str],
+        workers: int,
+        extract_status: Callable[[Response], str]
+) -> Iterator[Optional[str]]:
+    """Revalidates the stored pep documents with conditional requests.
+    Only the documents which have changed are parsed again,
+    the statuses of the others are taken from the stored state."""
+    state_path = mkdir_and_path(BASE_DIR, 'state', PEP_STATE_FILE)
+    stored = load_state(state_path)
+    # The documents that left the index are not kept in the state
+    state = {url: stored[url] for url in urls if url in stored}
+    headers = {url: conditional_headers(stored.get(url)) for url in urls}
+    try:
+        with session.cache_disabled():
+            responses = get_responses(session, urls, workers, headers)
+            for url, response in zip(urls, responses):
+                record = stored.get(url)
+                if response is None:
+                    # The stored status stands in for the failed page
+                    yield record and record['status']
+                    continue
+                if response.status_code == HTTPStatus.NOT_MODIFIED:
+                    state[url] = record
+                elif (record and
+                      record['hash'] == content_hash(response.content)):
+                    state[url] = make_record(response, record['status'])
+                else:
+                    status = extract_status(response)
+                    if status is None:
+                        # The stored status stands in for the broken page
+                        yield record and record['status']
+                        continue
+                    state[url] = make_record(response, status)
+                yield state[url]['status']
+    finally:
+        # The progress of the interrupted run is kept as well
+        save_state(state_path, state)
+
+
+@streamable
+def pep(
+        session: CachedSession,
+        workers: int = DEFAULT_WORKERS,
+        incremental: bool = False,
+        engine: str = Engine.BS4,
+        full_parse: bool = False,
+        extraction_cache: bool = False,
+        processes: Optional[int] = None,
+        shard: Optional[tuple[int, int]] = None,
+        index_only: bool = False,
+        verify_sample: Optional[int] = None
+) -> Iterator[tuple[str, str]]:
     """Counts the number of all pep documents,
     matches tabular data with those on the page of the document,
-    sums the number of documents for each category"""
+    sums the number of documents for each category.
+    The document pages are fetched by a pool of workers
+    and can be parsed by a pool of processes.
+    The shard counts only its part of the documents
+    and saves the partial results for the merge.
+    With index_only or verify_sample the documents are counted
+    from the index, and only a sample of the pages is read."""
     response = is_none(get_response(session, PEP_DOC_URL))
-    # Set the variables where we will save the data
-    results, status_sum, total = [Header.status_quantity, ], {}, 0
-
-    soup = BeautifulSoup(response.text, LXML)
-    section_tag = find_tag(soup, 'section', attrs={'id': 'numerical-index'})
-    tbody_tag = find_tag(section_tag, 'tbody')
-    tr_tags = tbody_tag.find_all('tr')
-    for pep in tqdm(tr_tags):
-        total += 1
-        status_letter = pep.td.abbr.text[1:]        # Letter from the table
-        href = find_tag(pep, 'a').get('href')
-        url = urljoin(base=PEP_DOC_URL, url=href)   # URL of pep document
-        # Jumping to the document page
-        response = is_none(get_response(session, url))
-        soup = BeautifulSoup(markup=response.text, features=LXML)
-        section_tag = find_tag(soup, 'section', attrs={'id': 'pep-content'})
-        status = find_tag(section_tag, 'abbr').text  # Status from the page
-        if status not in EXPECTED_STATUS[status_letter]:
-            logging.info(
-                f'\n'
-                f'Mismatched statuses: \n'
-                f'{url}\n'
-                f'Status on the page: {status}\n'
-                f'Expected statuses: {EXPECTED_STATUS[status_letter]}'
+    parser = load_parser(engine)
+    # Letter, URL and status of pep document for each row of the table
+    peps = [
+        pep._replace(link=urljoin(base=PEP_DOC_URL, url=pep.link))
+        for pep in parser.pep_rows(response.text, full_parse)
+    ]
+    if shard is not None:
+        peps = [pep for pep in peps if in_shard(pep.link, shard)]
+    parse_status = partial(parser.pep_status, full_parse=full_parse)
+    extractions = open_extractions(extraction_cache)
+    with closing(extractions):
+        if index_only or verify_sample:
+            status_sum, mismatches = index_statuses(
+                session, peps, workers, verify_sample or 0,
+                extractions, parse_status, processes
             )
-        if status not in status_sum:
-            status_sum[status] = 1
         else:
-            # Sums the number of documents for each category
-            status_sum[status] += 1
-    sorted_status_sum = sorted(status_sum.items())
-    results.extend(sorted_status_sum)
-    results.append(('Total', total))
-    return results
+            # Jumping to the document pages,
+            # the statuses come in the table order
+            urls = [pep.link for pep in peps]
+            if incremental:
+                statuses = incremental_pep_statuses(
+                    session, urls, workers,
+                    partial(extractions.extract, parse_status)
+                )
+            else:
+                statuses = pep_statuses(
+                    session, urls, workers, extractions, parse_status,
+                    processes
+                )
+            status_sum, mismatches = count_statuses(peps, statuses)
+    # Every row of the index is counted, the failed pages too
+    total = len(peps)
+    if shard is not None:
+        index, count = shard
+        save_shard(
+            mkdir_and_path(
+                BASE_DIR, 'shards',
+                PEP_SHARD_FILE.format(index=index, count=count)
+            ),
+            shard, status_sum, total, mismatches
+        )
+    # The table can only be output when all the documents are counted
+    yield from pep_table(status_sum, total)
+
+
+def count_statuses(
+        peps: list[PepLink], statuses: Iterator[Optional[str]]
+) -> tuple[dict[str, int], list[dict]]:
+    """Sums the number of documents for each status from their pages
+    and collects the documents which do not match their letter."""
+    from tqdm import tqdm
+
+    status_sum, mismatches = {}, []
+    with closing(statuses):
+        for pep, status in tqdm(zip(peps, statuses), total=len(peps)):
+            if status is None:
+                # The failed document is reported in the run summary,
+                # it is counted only in the total
+                continue
+            if status not in EXPECTED_STATUS[pep.status_letter]:
+                mismatches.append(pep_mismatch(
+                    pep, status, EXPECTED_STATUS[pep.status_letter]
+                ))
+            status_sum[status] = status_sum.get(status, 0) + 1
+    return status_sum, mismatches
+
+
+def index_statuses(
+        session: CachedSession,
+        peps: list[PepLink],
+        workers: int,
+        sample_size: int,
+        extractions: ExtractionCache,
+        parse_status: Callable[[str], str],
+        processes: Optional[int] = None
+) -> tuple[dict[str, int], list[dict]]:
+    """Counts the documents by the statuses the index gives them.
+    The pages are read only for a sample stratified by the status,
+    which estimates how often the index does not match the pages,
+    and for the documents the index gives no status."""
+    from tqdm import tqdm
+
+    listed = [pep for pep in peps if pep.status is not None]
+    sample = stratified_sample(listed, sample_size, attrgetter('status'))
+    visited = sample + [pep for pep in peps if pep.status is None]
+    statuses = pep_statuses(
+        session, [pep.link for pep in visited], workers,
+        extractions, parse_status, processes
+    )
+    page_statuses, mismatches = {}, []
+    checked = failed = 0
+    with closing(statuses):
+        for pep, status in tqdm(zip(visited, statuses), total=len(visited)):
+            if status is None:
+                continue
+            page_statuses[pep.link] = status
+            # The page has to have the status the index gives it,
+            # unless that one does not fit the letter either
+            expected = EXPECTED_STATUS[pep.status_letter]
+            if pep.status in expected:
+                expected = (pep.status,)
+            matched = status in expected
+            if not matched:
+                mismatches.append(pep_mismatch(pep, status, expected))
+            if pep.status is not None:
+                checked += 1
+                failed += not matched
+    status_sum = {}
+    for pep in peps:
+        status = pep.status or page_statuses.get(pep.link)
+        if status is not None:
+            status_sum[status] = status_sum.get(status, 0) + 1
+    if checked:
+        low, high = wilson_interval(failed, checked)
+        logging.info(
+            f'The pep index is verified by {checked} pages: '
+            f'{failed} mismatched, rate {failed / checked:.1%}, '
+            f'{CONFIDENCE:.0%} interval {low:.1%} - {high:.1%}'
+        )
+    return status_sum, mismatches
+
+
+def pep_mismatch(pep: PepLink, status: str, expected: tuple) -> dict:
+    mismatch = {'url': pep.link, 'status': status, 'expected': expected}
+    log_mismatch(mismatch)
+    return mismatch
+
+
+@streamable
+def merge_pep(paths: list[Path]) -> Iterator[tuple[str, str]]:
+    """Table of the pep mode summed from the partial results
+    the shards of one crawl have saved."""
+    status_sum, total, mismatches = merge_shards(paths)
+    for mismatch in mismatches:
+        log_mismatch(mismatch)
+    yield from pep_table(status_sum, total)
+
+
+def pep_table(
+        status_sum: dict[str, int], total: int
+) -> Iterator[tuple[str, str]]:
+    yield Header.status_quantity
+    for status, quantity in sorted(status_sum.items()):
+        yield StatusQuantity(status, quantity)
+    yield StatusQuantity(PEP_TOTAL, total)
+
+
+def log_mismatch(mismatch: dict) -> None:
+    logging.info(
+        f'\n'
+        f'Mismatched statuses: \n'
+        f'{mismatch["url"]}\n'
+        f'Status on the page: {mismatch["status"]}\n'
+        f'Expected statuses: {tuple(mismatch["expected"])}'
+    )
 
 
 MODE_TO_FUNCTION = {
@@ -133,25 +424,164 @@ MODE_TO_FUNCTION = {
     'download': download,
     'pep': pep
 }
+# Command line options passed to the modes as keyword arguments
+MODE_OPTIONS = {
+    'whats-new': (
+        'workers', 'engine', 'full_parse', 'extraction_cache', 'processes'
+    ),
+    'latest-versions': ('engine', 'full_parse'),
+    'download': (
+        'engine', 'full_parse', 'connections', 'artifacts', 'workers'
+    ),
+    'pep': (
+        'workers', 'incremental', 'engine', 'full_parse', 'extraction_cache',
+        'processes', 'shard', 'index_only', 'verify_sample'
+    ),
+}
+
+
+def selected_modes(modes: list[str]) -> list[str]:
+    """Modes to run in the given order, "all" stands for every mode."""
+    if ALL_MODES in modes:
+        return list(MODE_TO_FUNCTION)
+    return list(dict.fromkeys(modes))
+
+
+def pool_size(parser_modes: list[str], args: Namespace) -> int:
+    """Kept-alive connections per host: one for each worker, and each
+    archive of the download mode takes its connections at once."""
+    if args.pool_size:
+        return args.pool_size
+    if 'download' in parser_modes:
+        return max(args.workers, args.workers * args.connections)
+    return args.workers
+
+
+def mode_options(parser_mode: str, args: Namespace) -> dict:
+    """Command line options of the mode as its keyword arguments."""
+    return {
+        option: getattr(args, option)
+        for option in MODE_OPTIONS.get(parser_mode, ())
+    }
+
+
+def run_mode(
+        session: CachedSession, parser_mode: str, args: Namespace
+) -> None:
+    """Runs the mode with its options and outputs its results."""
+    from sessions import pool_stats
+
+    options = mode_options(parser_mode, args)
+    function = MODE_TO_FUNCTION[parser_mode]
+    if getattr(function, 'streamable', False):
+        # The rows are output as soon as the mode produces them
+        options['stream'] = True
+    # The pools are shared by the modes, each one records its own part
+    connections, requests = pool_stats(session)
+    with collector.mode_scope(parser_mode):
+        results = function(session, **options)
+        if results is not None:
+            # The outputs name the results by the mode they come from
+            control_output(results, Namespace(**{
+                **vars(args), 'mode': parser_mode
+            }))
+        total_connections, total_requests = pool_stats(session)
+        collector.record_connections(
+            total_connections - connections, total_requests - requests
+        )
+
+
+def serve_modes(
+        session: CachedSession, parser_modes: list[str], args: Namespace
+) -> None:
+    """Keeps the session warm and refreshes each mode on its schedule,
+    the latest results are served as JSON instead of the outputs."""
+    from server import serve
+
+    def refresh(parser_mode: str) -> Optional[list[tuple]]:
+        # The metrics tell about the last refresh of the mode
+        with collector.mode_scope(parser_mode, fresh=True):
+            return MODE_TO_FUNCTION[parser_mode](
+                session, **mode_options(parser_mode, args)
+            )
+
+    schedule = {
+        parser_mode: (
+            timedelta(seconds=args.expire_after) if args.expire_after
+            else MODE_EXPIRE_AFTER[parser_mode]
+        )
+        for parser_mode in parser_modes
+    }
+    serve(refresh, schedule, args.serve)
 
 
 def main() -> None:
-    configure_logging()
-    logging.info('Parser launched!')
     # Passing valid choices to the parser of CLI arguments
-    arg_parser = configure_argument_parser(MODE_TO_FUNCTION.keys())
-    # Reading arguments from the command line
+    arg_parser = configure_argument_parser([*MODE_TO_FUNCTION, ALL_MODES])
+    # Reading arguments from the command line, the help and the errors
+    # are shown before the log file and the session are opened
     args = arg_parser.parse_args()
+    if args.merge and selected_modes(args.mode) != ['pep']:
+        arg_parser.error('--merge объединяет только результаты режима pep')
+    configure_logging()
+    logging.info('Parser launched!')
     logging.info(f'Command Line Arguments: {args}')
-    session = CachedSession()
-    if args.clear_cache:
-        session.cache.clear()
-    # Get the parser mode from the command line arguments
-    parser_mode = args.mode
-    results = MODE_TO_FUNCTION[parser_mode](session)
+    if args.merge:
+        # The shards have fetched the pages, only their results are read
+        control_output(
+            merge_pep(args.merge, stream=True),
+            Namespace(**{**vars(args), 'mode': 'pep'})
+        )
+        logging.info('Parser has finished.')
+        return
+    from caches import make_cache
+    from sessions import AsyncSession, RevalidatingSession, mount_pools
 
-    if results is not None:
-        control_output(results, args)
+    # Get the parser modes from the command line arguments
+    parser_modes = selected_modes(args.mode)
+    # The least recently used pages are evicted beyond the size
+    cache = make_cache(
+        args.cache_backend, CACHE_NAME, args.cache_max_size * 2**20
+    )
+    # The modes share one session, so its pages are fresh for all of them
+    session = RevalidatingSession(
+        backend=cache,
+        expire_after=args.expire_after or min(
+            MODE_EXPIRE_AFTER[parser_mode] for parser_mode in parser_modes
+        ),
+        urls_expire_after=URLS_EXPIRE_AFTER
+    )
+    mount_pools(session, pool_size(parser_modes, args))
+    # The worker clones of the session share its retry budget
+    # and the throttles of the hosts
+    session.policy = RequestPolicy(
+        read_timeout=args.timeout,
+        retries=args.retries,
+        hedge_after=args.hedge_after,
+        rate=args.rate,
+        max_concurrency=args.pool_size or args.workers
+    )
+    if len(parser_modes) > 1 and args.serve is None:
+        # A page fetched by one mode is read by the others from memory,
+        # the served modes have to see the updated pages
+        session.share_pages(PAGE_MEMO_SIZE * 2**20)
+    if args.session == SessionType.ASYNC:
+        # Batches of pages are fetched on one event loop
+        session = AsyncSession(session, args.workers)
+    if args.cache == CacheAction.CLEAR:
+        session.cache.clear()
+    elif args.cache == CacheAction.COMPACT:
+        session.cache.compact()
+    if args.serve is not None:
+        serve_modes(session, parser_modes, args)
+    else:
+        for parser_mode in parser_modes:
+            run_mode(session, parser_mode, args)
+    # The last accesses of the cached pages keep them from the eviction
+    cache.flush()
+    collector.log_summary()
+    if args.metrics_file is not None:
+        collector.write_textfile(args.metrics_file)
     logging.info('Parser has finished.')
 
 
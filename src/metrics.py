@@ -0,0 +1,270 @@
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Iterator
+
+from constants import LATENCY_QUANTILES, METRICS_PREFIX
+
+
+def percentile(values: list[float], quantile: float) -> float:
+    """Nearest-rank percentile, zero for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(quantile * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def wire_size(response) -> int:
+    """Bytes of the body as they came over the network, the compressed
+    pages are counted before they are decoded."""
+    raw = getattr(response, 'raw', None)
+    size = raw.tell() if hasattr(raw, 'tell') else 0
+    if size:
+        return size
+    headers = getattr(response, 'headers', None) or {}
+    length = headers.get('Content-Length', '')
+    return int(length) if length.isdigit() else len(response.content)
+
+
+class ModeMetrics:
+    """Counters and timings of one parser mode."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.cache_hits = 0
+        self.bytes = 0
+        self.latencies = []
+        self.timings = {}
+        # Connections opened to the sites and requests sent through them
+        self.connections = 0
+        self.pool_requests = 0
+        # Requests sent again, and the pages failed after all the retries
+        self.retries = 0
+        self.hedges = 0
+        self.failures = {}
+
+    @property
+    def cache_misses(self) -> int:
+        return self.requests - self.cache_hits
+
+    @property
+    def connection_reuses(self) -> int:
+        """Requests sent over the kept-alive connections."""
+        return max(self.pool_requests - self.connections, 0)
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.cache_hits / self.requests if self.requests else 0.0
+
+
+class MetricsCollector:
+    """Collects the metrics of the run for each mode.
+    The responses may be recorded from the worker threads."""
+
+    def __init__(self) -> None:
+        self.modes = {}
+        self.mode = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> ModeMetrics:
+        return self.modes.setdefault(self.mode, ModeMetrics())
+
+    @contextmanager
+    def mode_scope(
+            self, mode: str, fresh: bool = False
+    ) -> Iterator[ModeMetrics]:
+        """Records everything inside the block for the given mode.
+        The fresh scope starts the metrics of the mode anew, so a mode
+        run again and again keeps only the metrics of its last run."""
+        if fresh:
+            with self._lock:
+                self.modes[mode] = ModeMetrics()
+        previous, self.mode = self.mode, mode
+        try:
+            with self.timer('run'):
+                yield self.current
+        finally:
+            self.mode = previous
+
+    def record_response(self, response, seconds: float) -> None:
+        with self._lock:
+            metrics = self.current
+            metrics.requests += 1
+            metrics.latencies.append(seconds)
+            if getattr(response, 'from_cache', False):
+                metrics.cache_hits += 1
+            else:
+                metrics.bytes += wire_size(response)
+
+    def record_connections(self, connections: int, requests: int) -> None:
+        with self._lock:
+            self.current.connections += connections
+            self.current.pool_requests += requests
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.current.retries += 1
+
+    def record_hedge(self) -> None:
+        with self._lock:
+            self.current.hedges += 1
+
+    def record_failure(self, url: str, reason: str) -> None:
+        """The page the mode goes on without."""
+        with self._lock:
+            self.current.failures[url] = reason
+
+    def add_bytes(self, size: int) -> None:
+        with self._lock:
+            self.current.bytes += size
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        """Adds the time spent inside the block to the phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start)
+
+    def add_time(self, phase: str, seconds: float) -> None:
+        """Adds the time measured elsewhere, e.g. in a worker process."""
+        with self._lock:
+            timings = self.current.timings
+            timings[phase] = timings.get(phase, 0.0) + seconds
+
+    def timed(self, phase: str) -> Callable:
+        """Decorator adding the time of each call to the phase."""
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(phase):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def log_summary(self) -> None:
+        with self._lock:
+            self._log_summary()
+
+    def _log_summary(self) -> None:
+        for mode, metrics in self.modes.items():
+            latencies = ', '.join(
+                f'p{round(quantile * 100)} '
+                f'{percentile(metrics.latencies, quantile) * 1000:.0f} ms'
+                for quantile in LATENCY_QUANTILES
+            )
+            timings = ', '.join(
+                f'{phase} {seconds:.2f} s'
+                for phase, seconds in sorted(metrics.timings.items())
+            )
+            logging.info(
+                f'Run metrics of {mode}: '
+                f'{metrics.requests} requests, '
+                f'cache hits {metrics.hit_ratio:.0%}, '
+                f'{metrics.bytes / 2**20:.2f} MiB transferred, '
+                f'{metrics.connections} connections opened, '
+                f'{metrics.connection_reuses} reused, '
+                f'{metrics.retries} retries, {metrics.hedges} hedged, '
+                f'{len(metrics.failures)} pages failed, '
+                f'fetch latency {latencies}, {timings}'
+            )
+            for url, reason in metrics.failures.items():
+                logging.warning(f'Failed page of {mode}: {url} ({reason})')
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format.
+        They are read under the lock, the modes may be recording."""
+        with self._lock:
+            return self._to_prometheus()
+
+    def _to_prometheus(self) -> str:
+        families = {
+            'requests_total': ('counter', 'HTTP requests made'),
+            'cache_hits_total': ('counter', 'Responses served from cache'),
+            'cache_misses_total': ('counter', 'Responses fetched from sites'),
+            'transferred_bytes_total': ('counter', 'Bytes fetched from sites'),
+            'connections_total': ('counter', 'Connections opened to sites'),
+            'connection_reuses_total': (
+                'counter', 'Requests sent over kept-alive connections'
+            ),
+            'retries_total': ('counter', 'Requests sent again'),
+            'hedged_requests_total': (
+                'counter', 'Slow requests sent once more'
+            ),
+            'failed_pages_total': (
+                'counter', 'Pages failed after all the retries'
+            ),
+            'fetch_latency_seconds': ('summary', 'Latency of the requests'),
+            'phase_seconds': ('gauge', 'Time spent in each run phase'),
+        }
+        # Samples of each family as the name suffix, labels and value
+        samples = {name: [] for name in families}
+        for mode, metrics in self.modes.items():
+            label = f'mode="{mode}"'
+            samples['requests_total'].append(('', label, metrics.requests))
+            samples['cache_hits_total'].append(
+                ('', label, metrics.cache_hits)
+            )
+            samples['cache_misses_total'].append(
+                ('', label, metrics.cache_misses)
+            )
+            samples['transferred_bytes_total'].append(
+                ('', label, metrics.bytes)
+            )
+            samples['connections_total'].append(
+                ('', label, metrics.connections)
+            )
+            samples['connection_reuses_total'].append(
+                ('', label, metrics.connection_reuses)
+            )
+            samples['retries_total'].append(('', label, metrics.retries))
+            samples['hedged_requests_total'].append(
+                ('', label, metrics.hedges)
+            )
+            samples['failed_pages_total'].append(
+                ('', label, len(metrics.failures))
+            )
+            latency = samples['fetch_latency_seconds']
+            for quantile in LATENCY_QUANTILES:
+                latency.append((
+                    '', f'{label},quantile="{quantile}"',
+                    percentile(metrics.latencies, quantile)
+                ))
+            latency.append(('_sum', label, sum(metrics.latencies)))
+            latency.append(('_count', label, len(metrics.latencies)))
+            for phase, seconds in sorted(metrics.timings.items()):
+                samples['phase_seconds'].append(
+                    ('', f'{label},phase="{phase}"', seconds)
+                )
+        lines = []
+        for name, (metric_type, help_text) in families.items():
+            metric = f'{METRICS_PREFIX}_{name}'
+            lines.append(f'# HELP {metric} {help_text}.')
+            lines.append(f'# TYPE {metric} {metric_type}')
+            for suffix, labels, value in samples[name]:
+                lines.append(f'{metric}{suffix}{{{labels}}} {value}')
+        metric = f'{METRICS_PREFIX}_last_run_timestamp_seconds'
+        lines.append(f'# HELP {metric} Time the run has finished.')
+        lines.append(f'# TYPE {metric} gauge')
+        lines.append(f'{metric} {time.time():.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: Path) -> None:
+        """Writes the metrics for the textfile collector of node_exporter.
+        The file is replaced at once, so it is never read half-written."""
+        temp_path = path.with_name(path.name + '.tmp')
+        temp_path.write_text(self.to_prometheus(), encoding='utf-8')
+        os.replace(temp_path, path)
+        logging.info(f'The metrics file has been saved -> {path}')
+
+
+# Metrics of the current run
+collector = MetricsCollector()
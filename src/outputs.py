@@ -2,39 +2,47 @@ import csv
 import datetime as dt
 import logging
 from argparse import Namespace
+from typing import Iterable
 
-from prettytable import PrettyTable
-
-from constants import BASE_DIR, DATETIME_FORMAT
+from constants import BASE_DIR, DATETIME_FORMAT, PEP_TOTAL, RESULTS_DB_FILE
+from metrics import collector
 from utils import mkdir_and_path
 
 
-def control_output(results: list[tuple], cli_args: Namespace) -> None:
-    """Sending parsing results to the selected output function."""
+def control_output(results: Iterable[tuple], cli_args: Namespace) -> None:
+    """Sending parsing results to the selected output function.
+    The results may be a stream of rows, which is read only once."""
     modes = {
         'pretty': pretty_output,
         'file': file_output,
+        'sqlite': sqlite_output,
         None: default_output
     }
     modes[cli_args.output](results, cli_args)
 
 
-def default_output(results: list[tuple], *args) -> None:
-    """Terminal output function."""
+def default_output(results: Iterable[tuple], *args) -> None:
+    """Terminal output function, each row is printed as it comes."""
     for row in results:
-        print(*row)
+        with collector.timer('output'):
+            print(*row, flush=True)
+
 
+def pretty_output(results: Iterable[tuple], *args) -> None:
+    """Outputs data in PrettyTable format.
+    The table is aligned by all its rows, so they are collected first."""
+    from prettytable import PrettyTable
 
-def pretty_output(results: list[tuple], *args) -> None:
-    """Outputs data in PrettyTable format."""
+    rows = iter(results)
     table = PrettyTable()
-    table.field_names = results[0]  # Set the first element as the title
+    table.field_names = next(rows)  # Set the first element as the title
     table.align = 'l'               # Aligning the table to the left
-    table.add_rows(results[1:])     # Adding rows left to the table
-    print(table)
+    table.add_rows(list(rows))      # Adding rows left to the table
+    with collector.timer('output'):
+        print(table)
 
 
-def file_output(results: list[tuple], cli_args: Namespace) -> None:
+def file_output(results: Iterable[tuple], cli_args: Namespace) -> None:
     """Outputs data in .csv format file."""
     parser_mode = cli_args.mode
     now = dt.datetime.now()
@@ -48,5 +56,27 @@ def file_output(results: list[tuple], cli_args: Namespace) -> None:
         # dialect='unix' format is to ensure that the data
         # is recorded in the same way on different OS
         writer = csv.writer(file, dialect='unix')
-        writer.writerows(results)
+        # The rows are written as they come, so an interrupted run
+        # keeps the rows it has collected
+        for row in results:
+            with collector.timer('output'):
+                writer.writerow(row)
     logging.info(f'The result file has been saved -> {file_path}')
+
+
+def sqlite_output(results: Iterable[tuple], cli_args: Namespace) -> None:
+    """Saves the rows of the run into the database of all the runs.
+    The headers and the pep total are not stored, they are derived."""
+    from database import save_run
+
+    started_at = dt.datetime.now()
+    rows = iter(results)
+    next(rows)  # Skip the headers
+    # The mode runs to the end before the database is opened,
+    # so the other runs are not locked out for the whole crawl
+    rows = [row for row in rows if row[0] != PEP_TOTAL]
+    # Create the folder "db" if not exists
+    db_path = mkdir_and_path(BASE_DIR, 'db', RESULTS_DB_FILE)
+    with collector.timer('output'):
+        run_id = save_run(db_path, cli_args.mode, rows, started_at)
+    logging.info(f'The run {run_id} has been saved -> {db_path}')
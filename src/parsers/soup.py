@@ -0,0 +1,144 @@
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from constants import ARTIFACT_ZIP_LINK, LXML
+from exceptions import FindVersionsException
+from metrics import collector
+from records import PepLink, Version, index_status, version_row
+from utils import find_tag, shared_extraction
+
+
+def has_class(name: str) -> Callable[[Optional[str]], bool]:
+    """Matches one of the classes of the element. While the page
+    is being parsed, SoupStrainer gets the class attribute unsplit."""
+    def _has_class(value: Optional[str]) -> bool:
+        return value is not None and name in value.split()
+    return _has_class
+
+
+# Parts of the pages the modes read, only they are built into the tree
+PAGE_STRAINERS = {
+    'whatsnew-index': SoupStrainer('div', class_=has_class('toctree-wrapper')),
+    'whatsnew-page': SoupStrainer(['h1', 'dl']),
+    'versions': SoupStrainer('div', class_=has_class('sphinxsidebarwrapper')),
+    'download': SoupStrainer('table', class_=has_class('docutils')),
+    'pep-index': SoupStrainer('section', id='numerical-index'),
+    'pep-page': SoupStrainer('section', id='pep-content'),
+}
+
+
+def parse_page(
+        markup: str, page: str, full_parse: bool = False
+) -> BeautifulSoup:
+    """Builds the tree of the part of the page the mode reads,
+    or of the whole page if full_parse is set."""
+    parse_only = None if full_parse else PAGE_STRAINERS[page]
+    return BeautifulSoup(markup, LXML, parse_only=parse_only)
+
+
+@contextmanager
+def single_page(
+        markup: str, page: str, full_parse: bool = False
+) -> Iterator[BeautifulSoup]:
+    """Tree of the page. It is decomposed as soon as the record
+    is extracted, so the trees do not pile up however many pages
+    the mode reads."""
+    soup = parse_page(markup, page, full_parse)
+    try:
+        yield soup
+    finally:
+        # The root is not linked to its tags in the chain of elements
+        # decompose() follows, so each of them is decomposed by itself
+        for tag in soup.find_all(recursive=False):
+            tag.decompose()
+        soup.decompose()
+
+
+@collector.timed('parse')
+@shared_extraction
+def whats_new_links(markup: str, full_parse: bool = False) -> list[str]:
+    """Links to the articles from the whatsnew index page."""
+    with single_page(markup, 'whatsnew-index', full_parse) as soup:
+        main_div = find_tag(soup, 'div', {'class': 'toctree-wrapper'})
+        li_tags = main_div.find_all('li', class_='toctree-l1')
+        # The first tag <a> has the hyper reference we are looking for
+        return [find_tag(li, 'a').get('href') for li in li_tags]
+
+
+@collector.timed('parse')
+def whats_new_article(
+        markup: str, full_parse: bool = False
+) -> tuple[str, str]:
+    """Python version and editors from the article page."""
+    with single_page(markup, 'whatsnew-page', full_parse) as soup:
+        python_version = find_tag(soup, 'h1').text
+        editors = find_tag(soup, 'dl').text.replace('\n', ' ')
+    return python_version, editors
+
+
+@collector.timed('parse')
+@shared_extraction
+def version_links(
+        markup: str, full_parse: bool = False
+) -> list[Version]:
+    """Links, versions and statuses from the sidebar of the main page."""
+    with single_page(markup, 'versions', full_parse) as soup:
+        sidebar = find_tag(soup, 'div', {'class': 'sphinxsidebarwrapper'})
+        for ul in sidebar.find_all('ul'):
+            if 'All versions' in ul.text:
+                a_tags = ul.find_all('a')
+                break
+        else:
+            # If the required list is not found,
+            # the program is interrupted and exception is raised
+            raise FindVersionsException('List of Python versions not found!')
+        return [
+            version_row(a_tag.get('href'), a_tag.text) for a_tag in a_tags
+        ]
+
+
+@collector.timed('parse')
+@shared_extraction
+def artifact_links(markup: str, full_parse: bool = False) -> dict[str, str]:
+    """Link to the zip archive of each format from the downloads table."""
+    links = {}
+    with single_page(markup, 'download', full_parse) as soup:
+        table_tag = find_tag(soup, 'table', attrs={'class': 'docutils'})
+        for tag in table_tag.find_all('a', href=ARTIFACT_ZIP_LINK):
+            href = tag.get('href')
+            links[ARTIFACT_ZIP_LINK.search(href)['artifact']] = href
+    return links
+
+
+@collector.timed('parse')
+@shared_extraction
+def pep_rows(
+        markup: str, full_parse: bool = False
+) -> list[PepLink]:
+    """Status letter, link and status of each document
+    from the pep index."""
+    rows = []
+    with single_page(markup, 'pep-index', full_parse) as soup:
+        section_tag = find_tag(
+            soup, 'section', attrs={'id': 'numerical-index'}
+        )
+        tbody_tag = find_tag(section_tag, 'tbody')
+        for pep in tbody_tag.find_all('tr'):
+            abbr_tag = find_tag(find_tag(pep, 'td'), 'abbr')
+            # Letter from the table and the hyper reference of the document
+            rows.append(PepLink(
+                abbr_tag.text[1:],
+                find_tag(pep, 'a').get('href'),
+                index_status(abbr_tag.get('title'))
+            ))
+    return rows
+
+
+@collector.timed('parse')
+def pep_status(markup: str, full_parse: bool = False) -> str:
+    """Status of the pep document from its page."""
+    with single_page(markup, 'pep-page', full_parse) as soup:
+        section_tag = find_tag(soup, 'section', attrs={'id': 'pep-content'})
+        return find_tag(section_tag, 'abbr').text
@@ -0,0 +1,158 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from lxml import etree, html
+
+from constants import ARTIFACT_ZIP_LINK
+from exceptions import FindVersionsException
+from metrics import collector
+from records import PepLink, Version, index_status, version_row
+from utils import find_xpath, shared_extraction
+
+
+def has_class(name: str) -> str:
+    """XPath predicate matching one of the classes of the element."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Precompiled XPath for the lookups of the modes,
+# the "(...)[1]" form selects the first match in the document order
+FIRST_LINK = etree.XPath('(.//a)[1]')
+TOCTREE_DIV = etree.XPath(f"(//div[{has_class('toctree-wrapper')}])[1]")
+TOCTREE_ITEMS = etree.XPath(f".//li[{has_class('toctree-l1')}]")
+FIRST_H1 = etree.XPath('(//h1)[1]')
+FIRST_DL = etree.XPath('(//dl)[1]')
+SIDEBAR_DIV = etree.XPath(f"(//div[{has_class('sphinxsidebarwrapper')}])[1]")
+LISTS = etree.XPath('.//ul')
+LINKS = etree.XPath('.//a')
+DOCUTILS_TABLE = etree.XPath(f"(//table[{has_class('docutils')}])[1]")
+# EXSLT regular expressions search the href like the pattern in bs4 does
+ARTIFACT_LINKS = etree.XPath(
+    f".//a[re:test(@href, '{ARTIFACT_ZIP_LINK.pattern}')]",
+    namespaces={'re': 'http://exslt.org/regular-expressions'}
+)
+NUMERICAL_INDEX = etree.XPath("(//section[@id='numerical-index'])[1]")
+FIRST_TBODY = etree.XPath('(.//tbody)[1]')
+ROWS = etree.XPath('.//tr')
+FIRST_TD = etree.XPath('(.//td)[1]')
+FIRST_ABBR = etree.XPath('(.//abbr)[1]')
+PEP_CONTENT = etree.XPath("(//section[@id='pep-content'])[1]")
+
+
+def parse_page(markup: str) -> html.HtmlElement:
+    """Builds the lxml tree of the page, an empty page gives empty tree."""
+    try:
+        return html.document_fromstring(markup)
+    except etree.ParserError:
+        return html.Element('html')
+
+
+@contextmanager
+def single_page(markup: str) -> Iterator[html.HtmlElement]:
+    """Tree of the page. It is cleared as soon as the record
+    is extracted. The records are plain strings:
+    the "smart" strings of lxml would keep their whole tree alive."""
+    tree = parse_page(markup)
+    try:
+        yield tree
+    finally:
+        tree.clear()
+
+
+@collector.timed('parse')
+@shared_extraction
+def whats_new_links(markup: str, full_parse: bool = False) -> list[str]:
+    """Links to the articles from the whatsnew index page."""
+    with single_page(markup) as tree:
+        main_div = find_xpath(
+            tree, TOCTREE_DIV, 'div', {'class': 'toctree-wrapper'}
+        )
+        return [
+            find_xpath(li, FIRST_LINK, 'a').get('href')
+            for li in TOCTREE_ITEMS(main_div)
+        ]
+
+
+@collector.timed('parse')
+def whats_new_article(
+        markup: str, full_parse: bool = False
+) -> tuple[str, str]:
+    """Python version and editors from the article page."""
+    with single_page(markup) as tree:
+        python_version = str(find_xpath(tree, FIRST_H1, 'h1').text_content())
+        editors = find_xpath(tree, FIRST_DL, 'dl').text_content()
+    return python_version, editors.replace('\n', ' ')
+
+
+@collector.timed('parse')
+@shared_extraction
+def version_links(
+        markup: str, full_parse: bool = False
+) -> list[Version]:
+    """Links, versions and statuses from the sidebar of the main page."""
+    with single_page(markup) as tree:
+        sidebar = find_xpath(
+            tree, SIDEBAR_DIV, 'div', {'class': 'sphinxsidebarwrapper'}
+        )
+        for ul in LISTS(sidebar):
+            if 'All versions' in ul.text_content():
+                a_tags = LINKS(ul)
+                break
+        else:
+            raise FindVersionsException('List of Python versions not found!')
+        return [
+            version_row(a_tag.get('href'), str(a_tag.text_content()))
+            for a_tag in a_tags
+        ]
+
+
+@collector.timed('parse')
+@shared_extraction
+def artifact_links(markup: str, full_parse: bool = False) -> dict[str, str]:
+    """Link to the zip archive of each format from the downloads table."""
+    links = {}
+    with single_page(markup) as tree:
+        table_tag = find_xpath(
+            tree, DOCUTILS_TABLE, 'table', {'class': 'docutils'}
+        )
+        for tag in ARTIFACT_LINKS(table_tag):
+            href = tag.get('href')
+            links[ARTIFACT_ZIP_LINK.search(href)['artifact']] = href
+    return links
+
+
+@collector.timed('parse')
+@shared_extraction
+def pep_rows(
+        markup: str, full_parse: bool = False
+) -> list[PepLink]:
+    """Status letter, link and status of each document
+    from the pep index."""
+    rows = []
+    with single_page(markup) as tree:
+        section_tag = find_xpath(
+            tree, NUMERICAL_INDEX, 'section', {'id': 'numerical-index'}
+        )
+        tbody_tag = find_xpath(section_tag, FIRST_TBODY, 'tbody')
+        for pep in ROWS(tbody_tag):
+            abbr_tag = find_xpath(
+                find_xpath(pep, FIRST_TD, 'td'), FIRST_ABBR, 'abbr'
+            )
+            rows.append(PepLink(
+                str(abbr_tag.text_content()[1:]),
+                find_xpath(pep, FIRST_LINK, 'a').get('href'),
+                index_status(abbr_tag.get('title'))
+            ))
+    return rows
+
+
+@collector.timed('parse')
+def pep_status(markup: str, full_parse: bool = False) -> str:
+    """Status of the pep document from its page."""
+    with single_page(markup) as tree:
+        section_tag = find_xpath(
+            tree, PEP_CONTENT, 'section', {'id': 'pep-content'}
+        )
+        return str(
+            find_xpath(section_tag, FIRST_ABBR, 'abbr').text_content()
+        )
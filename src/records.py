@@ -0,0 +1,50 @@
+import re
+from typing import NamedTuple, Optional
+
+from constants import PYTHON_VERSION_STATUS
+
+# Rows the modes produce after their header row. The named tuples
+# have no instance dictionaries and are still plain tuples
+# for the outputs, the database and the JSON of the server.
+
+
+class Article(NamedTuple):
+    link: str
+    title: str
+    editors: str
+
+
+class Version(NamedTuple):
+    link: str
+    version: str
+    status: str
+
+
+class PepLink(NamedTuple):
+    """Row of the pep index: status letter and link of the document,
+    and the status the index gives it, None if it gives none."""
+    status_letter: str
+    link: str
+    status: Optional[str] = None
+
+
+class StatusQuantity(NamedTuple):
+    status: str
+    quantity: int
+
+
+def version_row(link: str, text: str) -> Version:
+    # Search for pattern matching in the text of the link
+    text_match = re.search(PYTHON_VERSION_STATUS, text)
+    if text_match is not None:
+        version, status = text_match.groups()
+    else:
+        version, status = str(text), ''
+    return Version(link, version, status)
+
+
+def index_status(title: Optional[str]) -> Optional[str]:
+    # The title of the letters is like "Standards Track, Final"
+    if not title:
+        return None
+    return title.rpartition(', ')[2]
@@ -0,0 +1,104 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Optional
+from urllib.parse import urlsplit
+
+from constants import (CONNECT_TIMEOUT, HEDGE_THREADS, HOST_CONCURRENCY_MAX,
+                       HOST_RATE, READ_TIMEOUT, RETRIES, RETRY_BACKOFF,
+                       RETRY_BACKOFF_MAX, RETRY_BUDGET_RATIO,
+                       RETRY_BUDGET_RESERVE)
+from limits import HostLimiter
+
+
+class RetryBudget:
+    """Retries the run may still make. Every request adds the share
+    of a retry, so only about that share of the requests is retried
+    when the whole site fails, not each of them several times."""
+
+    def __init__(
+            self,
+            ratio: float = RETRY_BUDGET_RATIO,
+            reserve: int = RETRY_BUDGET_RESERVE
+    ) -> None:
+        self.ratio = ratio
+        self.tokens = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            self.tokens += self.ratio
+
+    def withdraw(self) -> bool:
+        """Takes one retry, False if the budget is spent."""
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RequestPolicy:
+    """How the pages are requested: the timeouts, the retries,
+    the hedging of the slow requests and the throttle of each host.
+    It is kept on the session, so the worker clones of the session
+    share its retry budget and its throttles.
+
+    With hedge_after set, the request which has not been answered
+    in that many seconds is sent once more, the first answer wins.
+    Each host gets rate requests per second and up to max_concurrency
+    concurrent ones, as many as it answers well; without a rate
+    the hosts are not throttled."""
+
+    def __init__(
+            self,
+            connect_timeout: float = CONNECT_TIMEOUT,
+            read_timeout: float = READ_TIMEOUT,
+            retries: int = RETRIES,
+            hedge_after: Optional[float] = None,
+            budget: Optional[RetryBudget] = None,
+            rate: Optional[float] = HOST_RATE,
+            max_concurrency: int = HOST_CONCURRENCY_MAX
+    ) -> None:
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.budget = budget or RetryBudget()
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self.limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url: str) -> Optional[HostLimiter]:
+        """Throttle of the host of the url, None if there is none."""
+        if self.rate is None:
+            return None
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.limiters:
+                self.limiters[host] = HostLimiter(
+                    self.rate, max_concurrency=self.max_concurrency
+                )
+            return self.limiters[host]
+
+    def backoff(self, attempt: int) -> float:
+        """Pause before the retry, the full jitter spreads the retries
+        of the workers instead of sending them at once."""
+        return random.uniform(
+            0, min(RETRY_BACKOFF * 2 ** (attempt - 1), RETRY_BACKOFF_MAX)
+        )
+
+    @cached_property
+    def executor(self) -> ThreadPoolExecutor:
+        # The late answers of the hedged requests finish in its threads
+        return ThreadPoolExecutor(
+            max_workers=HEDGE_THREADS, thread_name_prefix='hedge'
+        )
+
+
+def request_policy(session) -> RequestPolicy:
+    """Policy of the session. The session which has not been given
+    its own gets a fresh one without the throttle, so no state
+    is shared between the sessions."""
+    return getattr(session, 'policy', None) or RequestPolicy(rate=None)
@@ -0,0 +1,65 @@
+import math
+import random
+from typing import Callable, Hashable, Sequence, TypeVar
+
+from constants import CONFIDENCE_Z
+
+Item = TypeVar('Item')
+
+
+def stratified_sample(
+        items: Sequence[Item],
+        size: int,
+        stratum: Callable[[Item], Hashable],
+        rng: random.Random = random
+) -> list[Item]:
+    """Random sample of the items, each stratum is given its share
+    of the size by the largest remainders, and one item at least
+    while the size allows it. The items keep their order."""
+    strata = {}
+    for index, item in enumerate(items):
+        strata.setdefault(stratum(item), []).append(index)
+    size = min(size, len(items))
+    if size < len(strata):
+        counts = dict.fromkeys(rng.sample(list(strata), size), 1)
+    else:
+        quotas = {
+            key: size * len(indexes) / len(items)
+            for key, indexes in strata.items()
+        }
+        counts = {key: max(int(quota), 1) for key, quota in quotas.items()}
+        # The largest remainders take the rest of the size,
+        # the strata raised to one item give it back from the largest
+        by_remainder = sorted(
+            quotas, key=lambda key: quotas[key] - counts[key], reverse=True
+        )
+        for key in by_remainder[:max(size - sum(counts.values()), 0)]:
+            counts[key] = min(counts[key] + 1, len(strata[key]))
+        while sum(counts.values()) > size:
+            key = max(
+                (key for key in counts if counts[key] > 1),
+                key=lambda key: counts[key] - quotas[key]
+            )
+            counts[key] -= 1
+    chosen = sorted(
+        index
+        for key, count in counts.items()
+        for index in rng.sample(strata[key], count)
+    )
+    return [items[index] for index in chosen]
+
+
+def wilson_interval(
+        failures: int, trials: int, z: float = CONFIDENCE_Z
+) -> tuple[float, float]:
+    """Wilson score interval of the rate of the failures, it stays
+    within 0 and 1 for the small samples and the rates near zero."""
+    if not trials:
+        return 0.0, 1.0
+    rate = failures / trials
+    denominator = 1 + z ** 2 / trials
+    centre = (rate + z ** 2 / (2 * trials)) / denominator
+    margin = z * math.sqrt(
+        rate * (1 - rate) / trials + z ** 2 / (4 * trials ** 2)
+    ) / denominator
+    return max(centre - margin, 0.0), min(centre + margin, 1.0)
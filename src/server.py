@@ -0,0 +1,164 @@
+import datetime as dt
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from constants import SERVE_HOST
+from metrics import collector
+
+JSON_TYPE = 'application/json; charset=utf-8'
+
+
+class ResultsStore:
+    """Latest results of each mode, kept as ready JSON documents.
+    The watcher writes them and the HTTP handlers only read them."""
+
+    def __init__(self) -> None:
+        self._documents = {}
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def update(
+            self,
+            mode: str,
+            rows: Optional[list[tuple]] = None,
+            error: Optional[str] = None
+    ) -> None:
+        """Saves the results of the run, the failed run keeps the rows
+        of the last successful one and reports its error."""
+        with self._lock:
+            last = self._documents.get(
+                mode, {'updated_at': None, 'rows': None}
+            )
+            if error is None:
+                last = {
+                    'updated_at': dt.datetime.now().isoformat(
+                        timespec='seconds'
+                    ),
+                    'rows': rows,
+                }
+            self._documents[mode] = {'mode': mode, **last, 'error': error}
+            self._bodies[mode] = json.dumps(
+                self._documents[mode], ensure_ascii=False
+            ).encode()
+
+    def body(self, mode: str) -> Optional[bytes]:
+        with self._lock:
+            return self._bodies.get(mode)
+
+    def index(self) -> bytes:
+        """Time of the last successful run of each mode."""
+        with self._lock:
+            return json.dumps({
+                mode: document['updated_at']
+                for mode, document in self._documents.items()
+            }).encode()
+
+
+class Watcher(threading.Thread):
+    """Runs each mode again when its refresh period has passed."""
+
+    def __init__(
+            self,
+            run_mode: Callable[[str], Optional[list[tuple]]],
+            schedule: dict[str, timedelta],
+            store: ResultsStore
+    ) -> None:
+        super().__init__(name='watcher', daemon=True)
+        self.run_mode = run_mode
+        self.schedule = schedule
+        self.store = store
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        # Every mode is run at the start, then on its own schedule
+        due = dict.fromkeys(self.schedule, time.monotonic())
+        while not self.stopped.is_set():
+            mode = min(due, key=due.get)
+            if self.stopped.wait(max(due[mode] - time.monotonic(), 0)):
+                break
+            try:
+                self.store.update(mode, self.run_mode(mode))
+            except Exception as error:
+                # The failed run must not stop the refreshes of the modes
+                logging.exception(
+                    f'Error occurred while refreshing the mode -> {mode}!'
+                )
+                self.store.update(mode, error=repr(error))
+            due[mode] = (
+                time.monotonic() + self.schedule[mode].total_seconds()
+            )
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+def results_handler(store: ResultsStore) -> type:
+    """Handler class answering from the store:
+    "/" lists the modes, "/<mode>" gives the results of the mode
+    and "/metrics" gives the metrics of the runs for Prometheus."""
+
+    class ResultsHandler(BaseHTTPRequestHandler):
+
+        def send_body(
+                self, status: int, body: bytes, content_type: str
+        ) -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            path = self.path.strip('/')
+            if not path:
+                self.send_body(HTTPStatus.OK, store.index(), JSON_TYPE)
+                return
+            if path == 'metrics':
+                self.send_body(
+                    HTTPStatus.OK, collector.to_prometheus().encode(),
+                    'text/plain; version=0.0.4'
+                )
+                return
+            body = store.body(path)
+            if body is None:
+                self.send_body(
+                    HTTPStatus.NOT_FOUND,
+                    json.dumps({'error': f'No results of {path}'}).encode(),
+                    JSON_TYPE
+                )
+                return
+            self.send_body(HTTPStatus.OK, body, JSON_TYPE)
+
+        def log_message(self, format: str, *args) -> None:
+            logging.debug(format % args)
+
+    return ResultsHandler
+
+
+def serve(
+        run_mode: Callable[[str], Optional[list[tuple]]],
+        schedule: dict[str, timedelta],
+        port: int,
+        host: str = SERVE_HOST
+) -> None:
+    """Refreshes the modes in the background and serves their
+    latest results until the process is interrupted."""
+    store = ResultsStore()
+    watcher = Watcher(run_mode, schedule, store)
+    server = ThreadingHTTPServer((host, port), results_handler(store))
+    watcher.start()
+    logging.info(f'Serving the results -> http://{host}:{port}/')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info('The server has been stopped.')
+    finally:
+        watcher.stop()
+        server.server_close()
+        watcher.join()
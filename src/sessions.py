@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from typing import Iterable, Iterator, Optional
+
+from requests import PreparedRequest, Response, Session
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession
+from requests_cache.response import CachedResponse
+from urllib3.util.request import ACCEPT_ENCODING
+
+from caches import LruMemoryDict
+from constants import DEFAULT_WORKERS, POOL_HOSTS, PREFETCH_FACTOR
+from state import conditional_headers, validators
+from utils import get_response, ordered_results, thread_session
+
+
+class RevalidatingSession(CachedSession):
+    """Cached session that revalidates the expired responses.
+
+    The expired response is requested with If-None-Match and
+    If-Modified-Since headers, and on 304 Not Modified the cached
+    copy is kept for one more expiration period.
+
+    The modes of one run may also share the pages in memory (pages),
+    they read them then without going to the cache again."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Pages of the run, the worker clones of the session share them
+        self.pages = None
+
+    def share_pages(self, max_size: int) -> None:
+        """Keeps up to max_size bytes of the fetched pages in memory
+        for the rest of the run, they are not revalidated meanwhile."""
+        self.pages = LruMemoryDict(max_size)
+
+    def request(self, method: str, url: str, *args, **kwargs) -> Response:
+        # Only the plain page requests are shared, the conditional
+        # and the streamed ones have to reach the server
+        shared = (
+            self.pages is not None and method == 'GET'
+            and not self._disabled and not args
+            and not any(kwargs.get(name) for name in (
+                'params', 'headers', 'stream'
+            ))
+        )
+        if shared and url in self.pages:
+            self.pages.touch(url)
+            return self.pages[url]
+        response = super().request(method, url, *args, **kwargs)
+        if shared and response.ok:
+            self.pages[url] = response
+        return response
+
+    def _handle_expired_response(
+            self,
+            request: PreparedRequest,
+            response: CachedResponse,
+            cache_key: str,
+            **kwargs
+    ) -> Response:
+        request = request.copy()
+        request.headers.update(conditional_headers(validators(response)))
+        new_response = super()._handle_expired_response(
+            request, response, cache_key, **kwargs
+        )
+        if new_response.status_code != HTTPStatus.NOT_MODIFIED:
+            return new_response
+        logging.debug(f'The cached page is not modified -> {request.url}')
+        response.created_at = datetime.utcnow()
+        response.revalidate(self._get_expiration(request.url))
+        self.cache.responses[cache_key] = response
+        return response
+
+
+class AsyncSession:
+    """Cached session whose pages are awaited on an event loop,
+    while the requests themselves run on a pool of threads.
+
+    The requests go through the wrapped CachedSession,
+    so the caching works the same way as for the sync session.
+    Everything except get_many() is delegated to the wrapped session."""
+
+    def __init__(
+            self, session: CachedSession, workers: int = DEFAULT_WORKERS
+    ) -> None:
+        self.session = session
+        self.workers = workers
+        self.loop = asyncio.new_event_loop()
+        self._local = threading.local()
+
+    def __getattr__(self, name: str):
+        return getattr(self.session, name)
+
+    def _fetch(
+            self, url: str, headers: Optional[dict]
+    ) -> Optional[Response]:
+        """Fetches a page with the session of the current thread."""
+        if not hasattr(self._local, 'session'):
+            self._local.session = thread_session(self.session)
+        return get_response(self._local.session, url, headers)
+
+    def get_many(
+            self,
+            urls: Iterable[str],
+            headers: Optional[dict[str, dict]] = None
+    ) -> Iterator[Optional[Response]]:
+        """Fetches the pages concurrently, only a limited number of them
+        is requested ahead of the consumer.
+        Responses are yielded in the order of the urls.
+        The requests run on the threads of the executor, the event loop
+        only waits for their results."""
+        headers = headers or {}
+
+        def fetch(url: str) -> Future:
+            return executor.submit(self._fetch, url, headers.get(url))
+
+        def result(future: Future) -> Optional[Response]:
+            return self.loop.run_until_complete(
+                asyncio.wrap_future(future, loop=self.loop)
+            )
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            yield from ordered_results(
+                fetch, result, urls, self.workers * PREFETCH_FACTOR
+            )
+
+    def close(self) -> None:
+        self.loop.close()
+        self.session.close()
+
+
+def mount_pools(session: Session, pool_size: int) -> None:
+    """Keeps a pool of up to pool_size kept-alive connections per host,
+    so each worker thread reuses its connection instead of a handshake.
+    The compressed encodings are asked for those urllib3 can decode."""
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size)
+    for prefix in ('https://', 'http://'):
+        session.mount(prefix, adapter)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+
+def pool_stats(session: Session) -> tuple[int, int]:
+    """Numbers of the opened connections and of the requests sent
+    through the pools of the session."""
+    connections = requests = 0
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            connections += pools[key].num_connections
+            requests += pools[key].num_requests
+    return connections, requests
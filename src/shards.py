@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+
+from exceptions import ShardsException
+from state import content_hash, save_state
+
+
+def in_shard(url: str, shard: tuple[int, int]) -> bool:
+    """Whether the document belongs to the shard "index of count".
+    The shard depends on the URL only, so the rows added to the index
+    do not move the other documents to other shards."""
+    index, count = shard
+    return int(content_hash(url.encode()), 16) % count == index - 1
+
+
+def save_shard(
+        path: Path,
+        shard: tuple[int, int],
+        status_sum: dict[str, int],
+        total: int,
+        mismatches: list[dict]
+) -> None:
+    """Writes the partial aggregates of the shard for the merge."""
+    index, count = shard
+    save_state(path, {
+        'shard': {'index': index, 'count': count},
+        'status_sum': status_sum,
+        'total': total,
+        'mismatches': mismatches,
+    })
+
+
+def merge_shards(
+        paths: list[Path]
+) -> tuple[dict[str, int], int, list[dict]]:
+    """Sums the partial aggregates of every shard of one crawl.
+    The shards must all have the same count, each one exactly once."""
+    status_sum, total, mismatches = {}, 0, []
+    shards = {}
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8') as file:
+                document = json.load(file)
+            shard = (document['shard']['index'], document['shard']['count'])
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            raise ShardsException(
+                f'The shard cannot be read -> {path}: {error!r}'
+            )
+        if shard in shards:
+            raise ShardsException(
+                f'The shard {shard[0]}/{shard[1]} is given twice -> '
+                f'{shards[shard]}, {path}'
+            )
+        shards[shard] = path
+        for status, quantity in document['status_sum'].items():
+            status_sum[status] = status_sum.get(status, 0) + quantity
+        total += document['total']
+        mismatches.extend(document['mismatches'])
+    counts = {count for _, count in shards}
+    if len(counts) != 1:
+        raise ShardsException(
+            f'The shards belong to different crawls: {sorted(shards)}'
+        )
+    count = counts.pop()
+    missing = sorted(set(range(1, count + 1)) - {i for i, _ in shards})
+    if missing:
+        raise ShardsException(
+            f'The shards of {count} are missing: {missing}'
+        )
+    return status_sum, total, mismatches
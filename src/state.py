@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from requests import Response
+
+
+def load_state(path: Path) -> dict[str, dict]:
+    """Reads the stored records of the documents, keyed by URL.
+    A missing or broken file gives an empty state."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logging.exception(
+            f'Error occurred while reading the state -> {path}!',
+            stack_info=True
+        )
+        return {}
+
+
+def save_state(path: Path, state: dict[str, dict]) -> None:
+    """Writes the state through a temporary file,
+    so an interrupted run does not leave a broken file."""
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file, ensure_ascii=False, indent=1)
+    os.replace(temp_path, path)
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def conditional_headers(record: Optional[dict]) -> dict:
+    """Headers which let the server answer 304 Not Modified
+    if the document has not changed since it was stored."""
+    headers = {}
+    if record is None:
+        return headers
+    if record.get('etag'):
+        headers['If-None-Match'] = record['etag']
+    if record.get('last_modified'):
+        headers['If-Modified-Since'] = record['last_modified']
+    return headers
+
+
+def validators(response: Response) -> dict:
+    """Values of the response the server can validate the copy with."""
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+
+def make_record(response: Response, status: str) -> dict:
+    """Record of the document to be stored in the state."""
+    return {
+        'status': status,
+        **validators(response),
+        'hash': content_hash(response.content),
+    }
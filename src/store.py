@@ -0,0 +1,45 @@
+import logging
+import os
+from pathlib import Path
+
+from downloads import file_digest
+
+
+def object_path(objects_dir: Path, digest: str) -> Path:
+    """Path of the content, spread over the folders by the first
+    two characters of its hash."""
+    return objects_dir / digest[:2] / digest
+
+
+def store_file(objects_dir: Path, path: Path) -> bool:
+    """Keeps the content of the file in the store under its hash,
+    the file becomes a hardlink to it. Returns True if the same
+    content was stored already, so its copy has been dropped."""
+    stored_path = object_path(objects_dir, file_digest(path))
+    stored_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(path, stored_path)
+        return False
+    except FileExistsError:
+        if os.path.samefile(path, stored_path):
+            return False
+    # The link is made aside and replaces the file at once
+    link_path = path.with_name(path.name + '.link')
+    link_path.unlink(missing_ok=True)
+    os.link(stored_path, link_path)
+    os.replace(link_path, path)
+    return True
+
+
+def prune_store(objects_dir: Path) -> int:
+    """Removes the contents no downloaded file links to anymore,
+    returns the number of the bytes freed."""
+    freed = 0
+    for stored_path in objects_dir.glob('*/*'):
+        stats = stored_path.stat()
+        if stats.st_nlink == 1:
+            stored_path.unlink()
+            freed += stats.st_size
+    if freed:
+        logging.info(f'{freed} bytes of old downloads have been removed')
+    return freed
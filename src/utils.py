@@ -1,30 +1,251 @@
+from __future__ import annotations
+
+import copy
+import hashlib
 import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                wait)
 from enum import Enum
+from functools import partial, wraps
 from pathlib import Path
-from typing import Optional, Callable
-
-from bs4 import BeautifulSoup
-from bs4.element import Tag
-from requests import RequestException, Response
-from requests_cache import CachedSession
+from typing import (TYPE_CHECKING, Any, Callable, Iterable, Iterator,
+                    Optional, Union)
 
+from constants import PREFETCH_FACTOR, RETRY_STATUSES, SHARED_RECORDS
 from exceptions import NoneResponseException, ParserFindTagException
+from metrics import collector
+from retries import RequestPolicy, request_policy
 
+if TYPE_CHECKING:
+    # The modules of the annotations are only imported by the modes
+    from bs4 import BeautifulSoup
+    from bs4.element import Tag
+    from lxml.etree import XPath
+    from lxml.html import HtmlElement
+    from requests import Response
+    from requests_cache import CachedSession
 
-def get_response(session: CachedSession, url: str) -> Response:
-    """GET-response with the RequestException trapping."""
-    try:
-        response = session.get(url)
+
+def get_response(
+        session: CachedSession, url: str, headers: Optional[dict] = None
+) -> Optional[Response]:
+    """GET-response with the throttle of the host, the timeouts,
+    the retries and the hedging of the request policy of the session.
+    The page which has failed after them is recorded and gives None."""
+    from requests import RequestException
+
+    start = time.perf_counter()
+    response = cached_response(session, url, headers)
+    if response is not None:
+        # The cached page does not go to the site, nor to its throttle
+        collector.record_response(response, time.perf_counter() - start)
         response.encoding = 'utf-8'
         return response
-    except RequestException:
-        logging.exception(
-            f'Error occurred while loading the page -> {url}!',
-            # function call stack display
-            stack_info=True
+    policy = request_policy(session)
+    policy.budget.deposit()
+    limiter = policy.limiter(url)
+    attempt = 0
+    retryable = True
+    while True:
+        response = None
+        if limiter is not None:
+            with collector.timer('throttle'):
+                limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = send_request(session, url, headers, policy)
+            collector.record_response(response, time.perf_counter() - start)
+        except RequestException as error:
+            failure = repr(error)
+        else:
+            if response.ok:
+                response.encoding = 'utf-8'
+                return response
+            failure = f'HTTP {response.status_code}'
+            # The missing or forbidden page is not asked for again
+            retryable = response.status_code in RETRY_STATUSES
+            # The unread answer frees its connection for the retry
+            response.close()
+        finally:
+            if limiter is not None:
+                limiter.release(response, time.perf_counter() - start)
+        if (
+                not retryable or attempt >= policy.retries
+                or not policy.budget.withdraw()
+        ):
+            break
+        attempt += 1
+        collector.record_retry()
+        logging.warning(f'Retrying the page ({failure}) -> {url}')
+        time.sleep(policy.backoff(attempt))
+    logging.error(
+        f'Error occurred while loading the page -> {url}: {failure}'
+    )
+    collector.record_failure(url, failure)
+
+
+def cached_response(
+        session: CachedSession, url: str, headers: Optional[dict] = None
+) -> Optional[Response]:
+    """Page the session answers without going to the site: one of the
+    pages the run shares, or the fresh page of the cache. None if the
+    page is not cached, is expired or the session has no cache."""
+    from requests import Request
+
+    if getattr(session, 'cache', None) is None or session._disabled:
+        return None
+    pages = getattr(session, 'pages', None)
+    if pages is not None and not headers and url in pages:
+        return session.get(url)
+    request = session.prepare_request(Request('GET', url, headers=headers))
+    # The key has the verify setting requests sends the page with
+    settings = session.merge_environment_settings(
+        request.url, {}, None, None, None
+    )
+    response = session.cache.get_response(
+        session.cache.create_key(request, verify=settings['verify'])
+    )
+    if response is None or response.is_expired:
+        return None
+    return response
+
+
+def send_request(
+        session: CachedSession,
+        url: str,
+        headers: Optional[dict],
+        policy: RequestPolicy
+) -> Response:
+    """Sends the request, and once more if the first one has not been
+    answered in the hedge delay. The first answer is returned, the other
+    request finishes in the background on its own session clone."""
+    if policy.hedge_after is None:
+        return session.get(url, headers=headers, timeout=policy.timeout)
+
+    def fetch() -> Response:
+        # CachedSession holds its lock until the answer is read
+        return thread_session(session).get(
+            url, headers=headers, timeout=policy.timeout
+        )
+
+    pending = {policy.executor.submit(fetch)}
+    done, pending = wait(pending, timeout=policy.hedge_after)
+    if not done:
+        collector.record_hedge()
+        pending.add(policy.executor.submit(fetch))
+    while True:
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+        if not pending:
+            # Every request has failed, the error of one of them is raised
+            return done.pop().result()
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+
+def thread_session(session: CachedSession) -> CachedSession:
+    """Shallow copy of the session for a worker thread.
+    CachedSession holds its lock for the whole request, so the workers
+    get their own lock while sharing the cache, adapters and headers.
+    The async session is not copied but the session it wraps, so
+    cache_disabled() of one worker does not switch the cache of another."""
+    # The wrapped session of AsyncSession
+    session = getattr(session, 'session', session)
+    clone = object.__new__(type(session))
+    clone.__dict__.update(session.__dict__)
+    clone._lock = threading.RLock()
+    return clone
+
+
+def get_responses(
+        session: CachedSession,
+        urls: Iterable[str],
+        workers: int = 1,
+        headers: Optional[dict[str, dict]] = None
+) -> Iterator[Optional[Response]]:
+    """Fetches pages with a bounded pool of workers.
+    Responses are yielded in the order of the urls
+    regardless of the order in which the requests complete.
+    Extra request headers can be given for each url."""
+    headers = headers or {}
+    if hasattr(session, 'get_many'):
+        # The async session fetches the pages by itself
+        yield from session.get_many(urls, headers)
+        return
+    if workers <= 1:
+        for url in urls:
+            yield get_response(session, url, headers.get(url))
+        return
+    local = threading.local()
+
+    def fetch(url: str) -> Optional[Response]:
+        if not hasattr(local, 'session'):
+            local.session = thread_session(session)
+        return get_response(local.session, url, headers.get(url))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        yield from ordered_results(
+            partial(executor.submit, fetch), Future.result, urls,
+            workers * PREFETCH_FACTOR
         )
 
 
+def ordered_results(
+        submit: Callable[[Any], Future],
+        result: Callable[[Future], Any],
+        items: Iterable,
+        ahead: int
+) -> Iterator:
+    """Results of the items in their order. Only ahead items are
+    submitted before the consumer takes their results, and those
+    it has not taken are cancelled when it stops."""
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(submit(item))
+            if len(pending) >= ahead:
+                yield result(pending.popleft())
+        while pending:
+            yield result(pending.popleft())
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def shared_extraction(func: Callable[[str, bool], Any]) -> Callable:
+    """Keeps the records extracted from the last index pages, the modes
+    of one run and the refreshes of --serve read the same pages again.
+    Only the records are kept, under the hash of the page, and never
+    its tree; each caller gets its own copy of them.
+    The records are dropped with cache_clear(), as with lru_cache."""
+    records = OrderedDict()
+    lock = threading.Lock()
+
+    @wraps(func)
+    def wrapper(markup: str, full_parse: bool = False):
+        key = (hashlib.sha256(markup.encode()).digest(), full_parse)
+        with lock:
+            if key in records:
+                records.move_to_end(key)
+                return copy.copy(records[key])
+        record = func(markup, full_parse)
+        with lock:
+            records[key] = record
+            while len(records) > SHARED_RECORDS:
+                records.popitem(last=False)
+        return copy.copy(record)
+
+    def cache_clear() -> None:
+        with lock:
+            records.clear()
+
+    wrapper.cache_clear = cache_clear
+    return wrapper
+
+
 def is_none(
         func: Callable[[CachedSession, str], Response]
 ) -> Callable[[CachedSession, str], Response]:
@@ -61,6 +282,35 @@ def find_tag(
     return searched_tag
 
 
+def find_xpath(
+        element: HtmlElement,
+        xpath: XPath,
+        tag: str,
+        attrs: Optional[dict] = None
+) -> HtmlElement:
+    """Precompiled XPath lookup with the same erorr trapping as find_tag().
+    The tag and attrs describe the searched element in the message."""
+    searched = xpath(element)
+    if not searched:
+        error_msg = f'Не найден тег {tag} {attrs}'
+        logging.error(error_msg, stack_info=True)
+        raise ParserFindTagException(error_msg)
+    return searched[0]
+
+
+def streamable(
+        func: Callable[..., Iterator[tuple]]
+) -> Callable[..., Union[list[tuple], Iterator[tuple]]]:
+    """Lets the mode yield its rows one by one. The rows are collected
+    into a list, unless the caller asks for the stream (stream=True)."""
+    @wraps(func)
+    def wrapper(*args, stream: bool = False, **kwargs):
+        rows = func(*args, **kwargs)
+        return rows if stream else list(rows)
+    wrapper.streamable = True
+    return wrapper
+
+
 def enum_values(cls: Enum) -> tuple:
     """Gets a tuple of values within enum class."""
     return tuple([item for item in cls])
@@ -1,11 +1,16 @@
+import io
 import pytest
 import sys
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from bs4 import BeautifulSoup
 import requests_mock
 from argparse import Namespace
 from typing import List, Tuple
 
+from requests import Session
 from requests_cache import CachedSession, ALL_METHODS
 from requests_mock import Adapter
 
@@ -89,7 +94,7 @@ def soup(response_page):
 
 @pytest.fixture
 def pep_namespace():
-    return Namespace(mode='pep', clear_cache=False, output='file')
+    return Namespace(mode='pep', cache=None, output='file')
 
 
 def converting(what_convert: List[Tuple[List[int]]]) -> List[Tuple]:
@@ -110,3 +115,109 @@ def records():
         result = results[mode]
         return converting(result)
     return _records
+
+
+PEP_DOC_URL = 'https://peps.python.org/'
+PEP_STATUSES = [
+    ('SF', 'Final'), ('IA', 'Active'), ('SR', 'Rejected'),
+    ('S', 'Draft'), ('PW', 'Withdrawn'), ('SA', 'Active'),
+]
+
+
+def pep_index_page(
+        statuses: List[Tuple[str, str]], titles: bool = True
+) -> str:
+    title = ' title="Standards Track, {}"' if titles else ''
+    rows = ''.join(
+        f'<tr><td><abbr{title.format(status)}>{letters}</abbr></td>'
+        f'<td><a href="pep-{number:04}/">{number}</a></td></tr>'
+        for number, (letters, status) in enumerate(statuses, start=1)
+    )
+    return (
+        '<html><body><section id="numerical-index"><table><tbody>'
+        f'{rows}</tbody></table></section></body></html>'
+    )
+
+
+def pep_page(status: str) -> str:
+    return (
+        '<html><body><section id="pep-content"><dl>'
+        f'<dt>Status:</dt><dd><abbr>{status}</abbr></dd>'
+        '</dl></section></body></html>'
+    )
+
+
+def pep_page_callback(status: str, etag: str):
+    """Answers 304 Not Modified if the client has the same ETag."""
+    def _callback(request, context):
+        context.headers['ETag'] = etag
+        if request.headers.get('If-None-Match') == etag:
+            context.status_code = 304
+            return ''
+        return pep_page(status)
+    return _callback
+
+
+@pytest.fixture
+def pep_mocker():
+    with requests_mock.Mocker() as mock:
+        mock.get(PEP_DOC_URL, text=pep_index_page(PEP_STATUSES))
+        for number, (_, status) in enumerate(PEP_STATUSES, start=1):
+            mock.get(
+                f'{PEP_DOC_URL}pep-{number:04}/',
+                text=pep_page_callback(status, f'"pep-{number}"')
+            )
+        yield mock
+
+
+@pytest.fixture
+def local_server():
+    """Starts local HTTP servers with the given request handlers."""
+    servers = []
+
+    def _local_server(handler) -> str:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}'
+    yield _local_server
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Answers every GET request with its own path."""
+
+    def do_GET(self):
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def policy_session():
+    """Sessions with the request policy of the given options."""
+    from src import retries
+
+    def _policy_session(**options) -> Session:
+        session = Session()
+        session.policy = retries.RequestPolicy(**options)
+        # The retries are not paused in the tests
+        session.policy.backoff = lambda attempt: 0
+        return session
+    return _policy_session
+
+
+def zip_content(data: bytes) -> bytes:
+    """Zip archive with the data as its only member."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('docs.txt', data)
+    return buffer.getvalue()
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+from requests_cache import CachedSession
+from conftest import EchoHandler
+try:
+    from src import caches
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `caches.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `caches.py`'
+
+BACKENDS = ['sqlite', 'filesystem', 'memory']
+
+
+def stored_size(responses, key: str) -> int:
+    if isinstance(responses, caches.LruMemoryDict):
+        return len(responses[key].content)
+    return len(responses.serialize(responses[key]))
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_cache_lru_eviction(tmp_path, local_server, backend):
+    base_url = local_server(EchoHandler)
+    cache = caches.make_cache(backend, str(tmp_path / 'http_cache'))
+    session = CachedSession(backend=cache)
+    urls = [f'{base_url}/page-{number}' for number in range(4)]
+    for url in urls[:3]:
+        session.get(url)
+        time.sleep(0.01)
+    # The first page becomes the most recently used one
+    assert session.get(urls[0]).from_cache
+    time.sleep(0.01)
+    # The room is left for the three stored pages only
+    cache.responses.max_size = sum(
+        stored_size(cache.responses, key) for key in cache.responses
+    ) + 1
+    session.get(urls[3])
+    cached = [url for url in urls if url in cache.urls]
+    assert cached == [urls[0], urls[2], urls[3]], (
+        f'Кеш `{backend}` должен вытеснять давно не использованные страницы'
+    )
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_cache_clear_and_compact(tmp_path, local_server, backend):
+    base_url = local_server(EchoHandler)
+    cache = caches.make_cache(backend, str(tmp_path / 'http_cache'), 10**6)
+    session = CachedSession(backend=cache, expire_after=60)
+    session.get(f'{base_url}/page')
+    cache.compact()
+    assert session.get(f'{base_url}/page').from_cache, (
+        'Сжатие кеша не должно удалять актуальные страницы'
+    )
+    cache.clear()
+    assert not len(cache.responses)
+    session.get(f'{base_url}/page')
+    assert session.get(f'{base_url}/page').from_cache, (
+        'Кеш должен работать после очистки'
+    )
+
+
+def test_sqlite_cache_batches_accesses(tmp_path, local_server):
+    base_url = local_server(EchoHandler)
+    cache = caches.make_cache('sqlite', str(tmp_path / 'http_cache'), 10**6)
+    session = CachedSession(backend=cache)
+    session.get(f'{base_url}/page')
+    responses = cache.responses
+    key = next(iter(responses))
+
+    def accessed() -> float:
+        with responses.connection() as con:
+            return con.execute(
+                'SELECT accessed FROM responses WHERE key = ?', (key,)
+            ).fetchone()[0]
+
+    stored = accessed()
+    time.sleep(0.01)
+    assert session.get(f'{base_url}/page').from_cache
+    assert accessed() == stored, (
+        'Обращения к кешу не должны записываться по одному'
+    )
+    cache.flush()
+    assert accessed() > stored, 'Обращения к кешу должны сохраняться'
+    with responses.connection() as con:
+        total = con.execute('SELECT SUM(size) FROM responses').fetchone()[0]
+    assert responses._size == total, (
+        'Размер кеша должен учитываться без подсчёта по таблице'
+    )
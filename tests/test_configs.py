@@ -24,12 +24,13 @@ def test_configs_file():
         'Режимы работы парсера'
     ),
     (
-        argparse._StoreTrueAction, ['-c', '--clear-cache'], 'clear_cache',
-        None, 'Очистка кеша'
+        argparse._StoreAction, ['-c', '--cache'], 'cache',
+        ('clear', 'compact'),
+        'Очистка кеша или удаление его устаревших и лишних записей'
     ),
     (
         argparse._StoreAction, ['-o', '--output'], 'output',
-        ('pretty', 'file'),
+        ('pretty', 'file', 'sqlite'),
         'Дополнительные способы вывода данных'
     ),
 ])
@@ -64,3 +65,21 @@ def test_configure_argument_parser(
     assert got_action.help == help_str, (
         f'Укажите help-строку cli аргумента {got_action.dest}'
     )
+
+
+def test_several_modes():
+    parser = configs.configure_argument_parser(
+        ['whats-new', 'latest-versions', 'download', 'pep', 'all']
+    )
+    args = parser.parse_args(['whats-new', 'pep', '-o', 'file'])
+    assert args.mode == ['whats-new', 'pep'], (
+        'Парсер должен принимать несколько режимов за один запуск'
+    )
+
+
+@pytest.mark.parametrize('value', ['0/2', '3/2', '1-2', 'a/b'])
+def test_shard_argument(value):
+    parser = configs.configure_argument_parser(['pep'])
+    assert parser.parse_args(['pep', '--shard', '2/3']).shard == (2, 3)
+    with pytest.raises(SystemExit):
+        parser.parse_args(['pep', '--shard', value])
@@ -0,0 +1,192 @@
+import base64
+import hashlib
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from conftest import zip_content
+try:
+    from src import downloads
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `downloads.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `downloads.py`'
+
+CONTENT = zip_content(bytes(range(256)) * 1000)
+ETAG = '"archive-v1"'
+
+
+def repr_digest(content: bytes) -> str:
+    digest = base64.b64encode(hashlib.sha256(content).digest()).decode()
+    return f'sha-256=:{digest}:'
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    """Serves the archive with the support of the Range requests."""
+    requests = []
+    ranges = True
+    etag = ETAG
+    digest = repr_digest(CONTENT)
+
+    def send_archive(self, with_body):
+        self.requests.append((self.command, self.headers.get('Range')))
+        start, end, status = 0, len(CONTENT) - 1, 200
+        range_header = self.headers.get('Range')
+        if (
+                self.ranges and range_header
+                and self.headers.get('If-Range') == ETAG
+        ):
+            first, _, last = range_header[6:].partition('-')
+            start, status = int(first), 206
+            end = int(last) if last else end
+        body = CONTENT[start:end + 1]
+        self.send_response(status)
+        if self.etag:
+            self.send_header('ETag', self.etag)
+        self.send_header('Repr-Digest', self.digest)
+        if self.ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header(
+                'Content-Range', f'bytes {start}-{end}/{len(CONTENT)}'
+            )
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if with_body:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_archive(with_body=False)
+
+    def do_GET(self):
+        self.send_archive(with_body=True)
+
+    def log_message(self, *args):
+        pass
+
+
+class NoRangesHandler(ArchiveHandler):
+    ranges = False
+
+
+class NoETagHandler(ArchiveHandler):
+    etag = None
+
+
+class BrokenHandler(ArchiveHandler):
+    """Gives the checksum of another archive."""
+    digest = repr_digest(CONTENT[::-1])
+
+
+def archive_url(local_server, handler=ArchiveHandler):
+    ArchiveHandler.requests = []
+    return local_server(handler) + '/python-docs-pdf-a4.zip'
+
+
+def test_stream_download(tmp_path, local_server, mock_session):
+    path = tmp_path / 'archive.zip'
+    url = archive_url(local_server)
+    got = downloads.stream_download(mock_session, url, path)
+    assert got is True
+    assert path.read_bytes() == CONTENT, (
+        'Архив должен быть полностью записан в файл'
+    )
+    assert not downloads.part_path(path).exists(), (
+        'Временный файл должен быть переименован после загрузки'
+    )
+
+
+def test_stream_download_resume(tmp_path, local_server, mock_session):
+    path = tmp_path / 'archive.zip'
+    url = archive_url(local_server)
+    half = len(CONTENT) // 2
+    downloads.part_path(path).write_bytes(CONTENT[:half])
+    downloads.etag_path(downloads.part_path(path)).write_text(ETAG)
+    downloads.stream_download(mock_session, url, path)
+    assert ArchiveHandler.requests[-1] == ('GET', f'bytes={half}-'), (
+        'Прерванная загрузка должна продолжаться с заголовком Range'
+    )
+    assert path.read_bytes() == CONTENT
+
+
+def test_stream_download_restart(tmp_path, local_server, mock_session):
+    path = tmp_path / 'archive.zip'
+    url = archive_url(local_server, NoETagHandler)
+    downloads.part_path(path).write_bytes(CONTENT[::-1][:1000])
+    downloads.etag_path(downloads.part_path(path)).write_text('')
+    downloads.stream_download(mock_session, url, path)
+    assert ArchiveHandler.requests[-1] == ('GET', None), (
+        'Без ETag прерванная загрузка должна начинаться заново'
+    )
+    assert path.read_bytes() == CONTENT
+
+
+def test_stream_download_up_to_date(tmp_path, local_server, mock_session):
+    path = tmp_path / 'archive.zip'
+    url = archive_url(local_server)
+    downloads.stream_download(mock_session, url, path)
+    got = downloads.stream_download(mock_session, url, path)
+    methods = [method for method, _ in ArchiveHandler.requests]
+    assert got is False
+    assert methods == ['HEAD', 'GET', 'HEAD'], (
+        'Актуальный архив не должен загружаться повторно'
+    )
+
+
+def test_ranged_download(tmp_path, local_server, mock_session):
+    path = tmp_path / 'archive.zip'
+    url = archive_url(local_server)
+    got = downloads.stream_download(
+        mock_session, url, path, connections=4, part_size=64000
+    )
+    assert got is True
+    assert path.read_bytes() == CONTENT, (
+        'Части архива должны записываться на свои места в файле'
+    )
+    ranges = {
+        byte_range for method, byte_range in ArchiveHandler.requests
+        if method == 'GET'
+    }
+    assert ranges == {
+        f'bytes={start}-{min(start + 64000, len(CONTENT)) - 1}'
+        for start in range(0, len(CONTENT), 64000)
+    }, 'Большой архив должен загружаться частями по диапазонам байтов'
+
+
+def test_ranged_download_fallback(tmp_path, local_server, mock_session):
+    path = tmp_path / 'archive.zip'
+    url = archive_url(local_server, NoRangesHandler)
+    downloads.stream_download(
+        mock_session, url, path, connections=4, part_size=64000
+    )
+    assert ArchiveHandler.requests == [('HEAD', None), ('GET', None)], (
+        'Без поддержки диапазонов архив должен загружаться одним потоком'
+    )
+    assert path.read_bytes() == CONTENT
+
+
+def test_ranged_download_checksum(tmp_path, local_server, mock_session):
+    path = tmp_path / 'archive.zip'
+    url = archive_url(local_server, BrokenHandler)
+    with pytest.raises(BaseException) as excinfo:
+        downloads.stream_download(
+            mock_session, url, path, connections=4, part_size=64000
+        )
+    assert excinfo.typename == 'DownloadException', (
+        'Архив с неверной контрольной суммой должен выбросить '
+        '`DownloadException`'
+    )
+    assert not path.exists() and not downloads.part_path(path).exists()
+
+
+def test_verify_broken_zip(tmp_path):
+    temp_path = downloads.part_path(tmp_path / 'archive.zip')
+    # The member of the archive is damaged, the size is the same
+    content = CONTENT.replace(bytes(range(256)), bytes(256), 1)
+    temp_path.write_bytes(content)
+    with pytest.raises(BaseException) as excinfo:
+        downloads.verify_file(temp_path, downloads.RemoteFile(len(content)))
+    assert excinfo.typename == 'DownloadException', (
+        'Поврежденный архив должен выбросить `DownloadException` '
+        'и без контрольной суммы от сервера'
+    )
+    assert not temp_path.exists()
@@ -0,0 +1,93 @@
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+try:
+    from src import extractions
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `extractions.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `extractions.py`'
+
+PARSED = []
+
+
+def article(markup: str) -> tuple[str, str]:
+    PARSED.append(markup)
+    return markup.upper(), 'Editor'
+
+
+def page(url: str, text: str) -> SimpleNamespace:
+    return SimpleNamespace(url=url, text=text, content=text.encode())
+
+
+def test_extraction_cache(tmp_path):
+    PARSED.clear()
+    path = tmp_path / 'extractions.sqlite3'
+    cache = extractions.ExtractionCache(path)
+    assert cache.extract(article, page('a', 'one')) == ('ONE', 'Editor')
+    cache.close()
+    cache = extractions.ExtractionCache(path)
+    assert cache.extract(article, page('a', 'one')) == ('ONE', 'Editor'), (
+        'Сохранённая запись должна возвращаться в прежнем виде'
+    )
+    assert PARSED == ['one'], (
+        'Неизменившаяся страница не должна разбираться повторно'
+    )
+    assert cache.extract(article, page('a', 'two')) == ('TWO', 'Editor')
+    assert PARSED == ['one', 'two'], (
+        'Изменившаяся страница должна разбираться заново'
+    )
+    cache.close()
+
+
+def test_extraction_cache_batches(tmp_path):
+    import sqlite3
+    path = tmp_path / 'extractions.sqlite3'
+    cache = extractions.ExtractionCache(path, batch=2)
+    for url in ('a', 'b'):
+        cache.extract(article, page(url, url))
+    # Another process writes while the mode still runs
+    with sqlite3.connect(path, timeout=0) as connection:
+        connection.execute(
+            "INSERT INTO extractions VALUES ('z', '', '', 'null')"
+        )
+        stored = connection.execute(
+            'SELECT COUNT(*) FROM extractions'
+        ).fetchone()[0]
+    assert stored == 3, (
+        'Записи должны сохраняться частями, не дожидаясь конца режима'
+    )
+    cache.close()
+
+
+def test_extraction_cache_disabled():
+    PARSED.clear()
+    cache = extractions.ExtractionCache()
+    for _ in range(2):
+        cache.extract(article, page('a', 'one'))
+    cache.close()
+    assert PARSED == ['one', 'one']
+
+
+def test_extract_all_in_processes(tmp_path):
+    PARSED.clear()
+    pages = [page(f'url-{number}', f'page {number}') for number in range(6)]
+    cache = extractions.ExtractionCache(tmp_path / 'extractions.sqlite3')
+    cache.extract(article, pages[2])
+    collector = extractions.collector
+    with collector.mode_scope('test-processes', fresh=True) as metrics:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            got = list(cache.extract_all(article, pages, executor, ahead=4))
+    assert metrics.timings.get('parse', 0) > 0, (
+        'Время разбора страниц в процессах должно учитываться'
+    )
+    assert got == [(f'PAGE {number}', 'Editor') for number in range(6)], (
+        'Записи страниц из процессов должны идти в порядке страниц'
+    )
+    assert PARSED == ['page 2'], (
+        'Страницы должны разбираться в процессах, кроме сохранённых'
+    )
+    assert list(cache.extract_all(article, pages)) == got
+    assert PARSED == ['page 2'], (
+        'Записи, полученные из процессов, должны сохраняться в кеше'
+    )
+    cache.close()
@@ -0,0 +1,120 @@
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+from types import SimpleNamespace
+
+import pytest
+try:
+    from src import limits, retries, utils
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `limits.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `limits.py`'
+
+
+def answer(status: int = 200, **headers):
+    return SimpleNamespace(status_code=status, headers=headers)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('3', 3), ('0.5', 0.5), (None, None), ('soon', None), ('99999', 120),
+])
+def test_retry_after(value, expected):
+    assert limits.retry_after(value) == expected
+
+
+def test_retry_after_date():
+    seconds = limits.retry_after(formatdate(time.time() + 30, usegmt=True))
+    assert 25 < seconds <= 30
+
+
+def test_token_bucket():
+    limiter = limits.HostLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+        limiter.release(answer(), 0.01)
+    assert time.monotonic() - start >= 0.09, (
+        'Запросы к сайту должны ограничиваться скоростью ведра токенов'
+    )
+
+
+def test_cached_pages_not_throttled(mock_session):
+    url = 'mock://docs.python.org/cached'
+    mock_session.policy = retries.RequestPolicy()
+    limiter = mock_session.policy.limiter(url)
+    limiter.rate, limiter.burst, limiter.tokens = 1, 1, 1.0
+    utils.get_response(mock_session, url)
+    limit = limiter.limit
+    start = time.monotonic()
+    for _ in range(5):
+        assert utils.get_response(mock_session, url).from_cache
+    assert time.monotonic() - start < 0.5, (
+        'Страницы из кеша не должны ждать токенов ограничения сайта'
+    )
+    assert limiter.active == 0 and limiter.limit == limit, (
+        'Страницы из кеша не должны занимать и менять предел запросов'
+    )
+
+
+def test_session_without_policy(mock_session):
+    assert utils.request_policy(mock_session).limiter('mock://a/') is None, (
+        'Сессия без своей политики запросов не должна ограничиваться'
+    )
+
+
+def test_adaptive_concurrency():
+    limiter = limits.HostLimiter(rate=1000, burst=100, concurrency=4)
+    for _ in range(8):
+        limiter.acquire()
+        limiter.release(answer(), 0.01)
+    grown = limiter.limit
+    assert grown > 5, 'Предел параллельных запросов должен расти'
+    limiter.acquire()
+    limiter.release(answer(429), 0.01)
+    assert limiter.limit == grown / 2, (
+        'Ответ 429 должен уменьшать предел параллельных запросов вдвое'
+    )
+    limiter.acquire()
+    limiter.release(answer(503), 0.01)
+    assert limiter.limit == grown / 2, (
+        'Предел должен уменьшаться не чаще раза за круг ответов'
+    )
+    # The next round of the answers
+    time.sleep(0.05)
+    limiter.acquire()
+    limiter.release(answer(), 0.5)
+    assert limiter.limit == grown / 4, (
+        'Рост задержки должен уменьшать предел параллельных запросов'
+    )
+
+
+class BusyHandler(BaseHTTPRequestHandler):
+    """Asks to come back later on the first request of each page."""
+    requests = {}
+
+    def do_GET(self):
+        number = self.requests[self.path] = self.requests.get(self.path, 0) + 1
+        if number == 1:
+            self.send_response(429)
+            self.send_header('Retry-After', '0.3')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+def test_retry_after_honoured(policy_session, local_server):
+    base_url = local_server(BusyHandler)
+    start = time.monotonic()
+    response = utils.get_response(policy_session(), f'{base_url}/busy')
+    assert response.status_code == 200
+    assert time.monotonic() - start >= 0.3, (
+        'Повторный запрос должен ждать время из заголовка Retry-After'
+    )
@@ -1,5 +1,17 @@
+import os
+import re
+import subprocess
+import sys
+import threading
+import tracemalloc
+
 import pytest
+import requests
+import requests_mock
 from pathlib import Path
+from urllib.parse import urljoin
+from conftest import (PEP_DOC_URL, PEP_STATUSES, pep_index_page, pep_page,
+                      zip_content)
 try:
     from src import main
 except ModuleNotFoundError:
@@ -140,3 +152,359 @@ def test_mode_to_function():
             'В модуле `main.py` в объекте `MODE_TO_FUNCTION` '
             f'нет значения {func}'
         )
+
+
+PEP_ANSWER = [
+    ('Status', 'Quantity'),
+    ('Active', 2),
+    ('Draft', 1),
+    ('Final', 1),
+    ('Rejected', 1),
+    ('Withdrawn', 1),
+    ('Total', 6),
+]
+
+
+@pytest.mark.parametrize('workers, engine, full_parse', [
+    (1, 'bs4', False), (4, 'bs4', False), (1, 'bs4', True), (4, 'lxml', False),
+])
+def test_pep_workers(mock_session, pep_mocker, workers, engine, full_parse):
+    got = main.pep(
+        mock_session, workers=workers, engine=engine, full_parse=full_parse
+    )
+    answer = PEP_ANSWER
+    assert got == answer, (
+        'Функция `pep` должна возвращать одинаковую таблицу '
+        'при любом количестве потоков, движке и способе разбора страниц, '
+        f'ожидается ```{answer}```'
+    )
+
+
+@pytest.mark.parametrize('engine', ['bs4', 'lxml'])
+def test_pep_processes(mock_session, pep_mocker, engine):
+    got = main.pep(mock_session, workers=4, engine=engine, processes=2)
+    assert got == PEP_ANSWER, (
+        'Разбор страниц в нескольких процессах должен давать ту же таблицу'
+    )
+
+
+def test_parse_pool_with_held_lock():
+    from extractions import timed_extract
+
+    article = main.load_parser('bs4').whats_new_article
+    markup = '<h1>Python 3.12</h1><dl>Editor</dl>'
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        # A fetch thread recording its response at the time of the fork
+        with main.collector._lock:
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    held.wait()
+    executor = main.parse_pool(1)
+    try:
+        future = executor.submit(timed_extract, article, markup)
+        record, _ = future.result(timeout=60)
+    except TimeoutError:
+        # The blocked process would keep the pool from shutting down
+        for process in executor._processes.values():
+            process.kill()
+        raise
+    finally:
+        release.set()
+        thread.join()
+        executor.shutdown()
+    assert record == ('Python 3.12', 'Editor'), (
+        'Процессы разбора не должны ждать блокировок основного процесса'
+    )
+
+
+def test_pep_index_only(mock_session, pep_mocker):
+    got = main.pep(mock_session, index_only=True)
+    assert got == PEP_ANSWER, (
+        'Подсчет по таблице индекса должен давать ту же таблицу'
+    )
+    assert pep_mocker.call_count == 1, (
+        'Режим `--index-only` не должен загружать страницы документов'
+    )
+
+
+def test_pep_verify_sample(mock_session, pep_mocker):
+    pep_mocker.get(
+        PEP_DOC_URL, text=pep_index_page(PEP_STATUSES, titles=False)
+    )
+    got = main.pep(mock_session, verify_sample=3)
+    assert got == PEP_ANSWER, (
+        'Статусы документов без статуса в индексе берутся с их страниц'
+    )
+    pep_mocker.get(PEP_DOC_URL, text=pep_index_page(PEP_STATUSES))
+    mock_session.cache.clear()
+    pep_mocker.reset_mock()
+    assert main.pep(mock_session, verify_sample=3) == PEP_ANSWER
+    assert pep_mocker.call_count == 4, (
+        'Режим `--verify-sample K` должен загружать индекс '
+        'и K страниц документов'
+    )
+
+
+ARTIFACTS_PAGE = '''<html><body><table class="docutils align-default">
+<tr><td><a href="archives/python-3.12-docs-html.zip">Download</a></td></tr>
+<tr><td><a href="archives/python-3.12-docs-text.zip">Download</a></td></tr>
+<tr><td><a href="archives/python-3.12-docs-epub.zip">Download</a></td></tr>
+</table></body></html>'''
+
+
+def test_download_artifacts(monkeypatch, tmp_path, mock_session):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    downloads_url = urljoin(main.MAIN_DOC_URL, 'download.html')
+    content = zip_content(b'PK' * 1024)
+    with requests_mock.Mocker() as mock:
+        mock.get(downloads_url, text=ARTIFACTS_PAGE)
+        for artifact in ('html', 'text', 'epub'):
+            url = urljoin(
+                downloads_url, f'archives/python-3.12-docs-{artifact}.zip'
+            )
+            mock.head(url, headers={'Content-Length': str(len(content))})
+            mock.get(url, content=content)
+        main.download(mock_session, artifacts=['html', 'text'], workers=2)
+    html, text, epub = (
+        tmp_path / 'downloads' / f'python-3.12-docs-{artifact}.zip'
+        for artifact in ('html', 'text', 'epub')
+    )
+    assert html.read_bytes() == content and not epub.exists(), (
+        'Режим `download` должен загружать архивы выбранных форматов'
+    )
+    assert os.path.samefile(html, text), (
+        'Архивы с одинаковым содержимым должны быть жесткими ссылками '
+        'на одно хранимое содержимое'
+    )
+    assert len(list((tmp_path / 'downloads' / 'objects').glob('*/*'))) == 1
+
+
+def test_download_failed_artifact(monkeypatch, tmp_path, mock_session):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    downloads_url = urljoin(main.MAIN_DOC_URL, 'download.html')
+    archives = urljoin(downloads_url, 'archives/')
+    with requests_mock.Mocker() as mock:
+        mock.get(downloads_url, text=ARTIFACTS_PAGE)
+        mock.head(requests_mock.ANY, status_code=405)
+        mock.get(f'{archives}python-3.12-docs-html.zip', status_code=500)
+        mock.get(
+            f'{archives}python-3.12-docs-text.zip', content=zip_content(b'PK')
+        )
+        main.download(mock_session, artifacts=['html', 'text'], workers=2)
+    assert (tmp_path / 'downloads' / 'python-3.12-docs-text.zip').exists(), (
+        'Неудавшийся архив не должен прерывать загрузку остальных'
+    )
+    assert f'{archives}python-3.12-docs-html.zip' in (
+        main.collector.current.failures
+    ), 'Неудавшийся архив должен записываться в метрики'
+
+
+def test_pep_failed_page(mock_session, pep_mocker):
+    pep_mocker.get(f'{PEP_DOC_URL}pep-0002/', status_code=500)
+    mock_session.policy = main.RequestPolicy(retries=0)
+    got = main.pep(mock_session, workers=2)
+    assert ('Active', 1) in got, (
+        'Неудавшаяся страница не должна прерывать подсчет PEP-документов'
+    )
+    assert got[-1] == ('Total', 6), (
+        'Итог должен учитывать все строки индекса, '
+        'в том числе неудавшиеся страницы'
+    )
+
+
+@pytest.mark.parametrize('answer', [
+    {'status_code': 404}, {'text': '<html><body></body></html>'}
+])
+@pytest.mark.parametrize('options', [
+    {}, {'processes': 2}, {'incremental': True}
+])
+def test_pep_broken_page(
+        monkeypatch, tmp_path, mock_session, pep_mocker, answer, options
+):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    url = f'{PEP_DOC_URL}pep-0003/'
+    pep_mocker.get(url, **answer)
+    got = main.pep(mock_session, workers=2, **options)
+    assert got[-1] == ('Total', 6), (
+        'Отсутствующая или неразобранная страница не должна прерывать '
+        'подсчет PEP-документов'
+    )
+    assert url in main.collector.current.failures, (
+        'Отсутствующая или неразобранная страница должна записываться '
+        'в метрики'
+    )
+    requested = [
+        request for request in pep_mocker.request_history
+        if request.url == url
+    ]
+    assert len(requested) == 1, (
+        'Отсутствующая страница не должна запрашиваться повторно'
+    )
+
+
+def test_pep_shards(monkeypatch, tmp_path, mock_session, pep_mocker):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    totals = [
+        main.pep(mock_session, shard=(index, 3))[-1][1]
+        for index in (1, 2, 3)
+    ]
+    assert sum(totals) == 6, (
+        'Каждый PEP-документ должен попадать ровно в одну часть'
+    )
+    paths = sorted((tmp_path / 'shards').glob('pep-*-of-3.json'))
+    assert main.merge_pep(paths) == PEP_ANSWER, (
+        'Объединение частей должно давать таблицу режима `pep`'
+    )
+    with pytest.raises(BaseException) as excinfo:
+        main.merge_pep(paths[1:])
+    assert excinfo.typename == 'ShardsException', (
+        'Объединение без одной из частей должно выбросить `ShardsException`'
+    )
+
+
+def pep_crawl_peak(count: int) -> int:
+    """Peak of the memory traced while pep reads count large pages."""
+    padding = '<p>Lorem ipsum</p>' * 1000
+    page = pep_page('Final').replace('</dl>', f'</dl>{padding}')
+    with requests_mock.Mocker() as mock:
+        mock.get(PEP_DOC_URL, text=pep_index_page([('SF', 'Final')] * count))
+        # Every document has its own page, as it does on the site
+        mock.get(
+            re.compile(f'{PEP_DOC_URL}pep-'),
+            text=lambda request, context: f'{page}<!-- {request.url} -->'
+        )
+        tracemalloc.start()
+        try:
+            got = main.pep(requests.Session())
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    assert got[-1] == ('Total', count)
+    return peak
+
+
+def test_pep_memory_cap():
+    # The first crawl imports the modules the mode needs.
+    # The trees of lxml are not traced, so the bs4 ones are measured
+    pep_crawl_peak(2)
+    few, many = pep_crawl_peak(4), pep_crawl_peak(36)
+    assert many < few * 1.5, (
+        'Память режима `pep` не должна расти с количеством документов: '
+        f'{few} байт на 4 документах, {many} байт на 36'
+    )
+
+
+def test_pep_incremental(monkeypatch, tmp_path, mock_session, pep_mocker):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    first = main.pep(mock_session, incremental=True)
+    assert (tmp_path / 'state' / 'pep.json').exists(), (
+        'Режим `--incremental` должен сохранять состояние PEP-документов'
+    )
+    pep_mocker.reset_mock()
+    second = main.pep(mock_session, incremental=True)
+    not_modified = [
+        request for request in pep_mocker.request_history
+        if request.headers.get('If-None-Match')
+    ]
+    assert first == second == PEP_ANSWER, (
+        'Режим `--incremental` должен возвращать ту же таблицу'
+    )
+    assert len(not_modified) == 6, (
+        'Сохраненные PEP-документы должны проверяться условными запросами'
+    )
+
+
+@pytest.mark.parametrize('modes, expected', [
+    (['pep', 'whats-new', 'pep'], ['pep', 'whats-new']),
+    (['pep', 'all'], ['whats-new', 'latest-versions', 'download', 'pep']),
+])
+def test_selected_modes(modes, expected):
+    assert main.selected_modes(modes) == expected, (
+        'Режимы должны запускаться по одному разу в заданном порядке, '
+        '`all` запускает все режимы'
+    )
+
+
+@pytest.mark.parametrize('modes, options, expected', [
+    (['pep'], [], 1),
+    (['download'], [], 4),
+    (['pep', 'download'], ['-w', '3', '--connections', '2'], 6),
+    (['download'], ['--pool-size', '2'], 2),
+])
+def test_pool_size(modes, options, expected):
+    parser = main.configure_argument_parser(main.MODE_TO_FUNCTION)
+    args = parser.parse_args([*modes, *options])
+    assert main.pool_size(modes, args) == expected, (
+        'Пул соединений должен вмещать соединения каждого архива '
+        'режима `download`'
+    )
+
+
+def test_pep_extraction_cache(monkeypatch, tmp_path, mock_session, pep_mocker):
+    monkeypatch.setattr(main, 'BASE_DIR', Path(tmp_path))
+    parsed = []
+    soup = main.load_parser('bs4')
+    parse_page = soup.parse_page
+    monkeypatch.setattr(
+        soup, 'parse_page',
+        lambda *args: parsed.append(args[1]) or parse_page(*args)
+    )
+    first = main.pep(mock_session, extraction_cache=True)
+    assert parsed.count('pep-page') == 6
+    parsed.clear()
+    second = main.pep(mock_session, extraction_cache=True)
+    assert first == second == PEP_ANSWER
+    assert 'pep-page' not in parsed, (
+        'Статусы неизменившихся PEP-документов должны браться из кеша'
+    )
+
+
+HEAVY_MODULES = (
+    'bs4', 'lxml', 'prettytable', 'requests', 'requests_cache', 'tqdm'
+)
+STARTUP_CODE = """
+import runpy, sys
+sys.path.insert(0, 'src')
+sys.argv = ['main.py', {args}]
+try:
+    runpy.run_path('src/main.py', run_name='__main__')
+except SystemExit:
+    pass
+print('imported:', *sorted(set({modules}) & sys.modules.keys()))
+"""
+
+
+@pytest.mark.parametrize('args', ["'-h'", "'unknown-mode'"])
+def test_startup_imports(args):
+    code = STARTUP_CODE.format(args=args, modules=HEAVY_MODULES)
+    got = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True
+    )
+    imported = got.stdout.strip().splitlines()[-1].split()[1:]
+    assert not imported, (
+        'Справка и ошибки аргументов не должны импортировать '
+        f'тяжёлые зависимости: {imported}'
+    )
+
+
+ENGINE_CODE = """
+import sys
+sys.path.insert(0, 'src')
+import main
+main.load_parser('lxml')
+print('imported:', 'bs4' in sys.modules)
+"""
+
+
+def test_lxml_engine_imports():
+    got = subprocess.run(
+        [sys.executable, '-c', ENGINE_CODE], capture_output=True, text=True
+    )
+    assert got.stdout.strip().splitlines()[-1] == 'imported: False', (
+        'Движок lxml не должен импортировать bs4'
+    )
@@ -0,0 +1,94 @@
+import gzip
+from http.server import BaseHTTPRequestHandler
+from types import SimpleNamespace
+
+import requests
+try:
+    from src import metrics
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `metrics.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `metrics.py`'
+
+
+def test_percentile():
+    values = [0.1, 0.4, 0.2, 0.3]
+    assert metrics.percentile(values, 0.5) == 0.2
+    assert metrics.percentile(values, 0.99) == 0.4
+    assert metrics.percentile([], 0.5) == 0.0
+
+
+def test_collector_textfile(tmp_path):
+    collector = metrics.MetricsCollector()
+    with collector.mode_scope('pep'):
+        collector.record_response(
+            SimpleNamespace(from_cache=False, content=b'page'), 0.2
+        )
+        collector.record_response(
+            SimpleNamespace(from_cache=True, content=b'page'), 0.01
+        )
+        with collector.timer('parse'):
+            pass
+        collector.record_connections(1, 2)
+    pep = collector.modes['pep']
+    assert (pep.requests, pep.cache_hits, pep.bytes) == (2, 1, 4), (
+        'Сборщик метрик должен считать запросы, попадания в кеш и байты'
+    )
+    assert {'run', 'parse'} <= set(pep.timings)
+    path = tmp_path / 'parser.prom'
+    collector.write_textfile(path)
+    text = path.read_text()
+    assert 'bs4_parser_requests_total{mode="pep"} 2' in text
+    assert 'bs4_parser_cache_misses_total{mode="pep"} 1' in text
+    assert 'bs4_parser_fetch_latency_seconds_count{mode="pep"} 2' in text
+    assert '# TYPE bs4_parser_fetch_latency_seconds summary' in text
+    assert 'bs4_parser_connection_reuses_total{mode="pep"} 1' in text
+
+
+def test_collector_fresh_scope():
+    collector = metrics.MetricsCollector()
+    for run in range(3):
+        with collector.mode_scope('pep', fresh=True):
+            collector.record_response(
+                SimpleNamespace(from_cache=True, content=b''), 0.1
+            )
+            if run == 0:
+                collector.record_failure('pep-0001', 'HTTP 503')
+    pep = collector.modes['pep']
+    assert len(pep.latencies) == 1 and pep.requests == 1, (
+        'Метрики режима, который обновляется снова и снова, '
+        'должны описывать только его последний запуск'
+    )
+    assert not pep.failures, (
+        'Восстановившаяся страница не должна оставаться среди неудавшихся'
+    )
+
+
+PAGE = b'<p>Python</p>' * 1000
+
+
+class GzipHandler(BaseHTTPRequestHandler):
+    """Answers with the compressed page."""
+
+    def do_GET(self):
+        body = gzip.compress(PAGE)
+        self.send_response(200)
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_collector_wire_bytes(local_server):
+    response = requests.get(local_server(GzipHandler))
+    assert response.content == PAGE
+    collector = metrics.MetricsCollector()
+    with collector.mode_scope('pep'):
+        collector.record_response(response, 0.1)
+    assert collector.modes['pep'].bytes == len(gzip.compress(PAGE)), (
+        'Сборщик метрик должен считать байты, полученные по сети, '
+        'а не распакованные'
+    )
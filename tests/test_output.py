@@ -90,3 +90,91 @@ def test_output_file():
     assert hasattr(outputs, 'file_output'), (
         'Напишите функцию `file_output` в модуле `output.py`'
     )
+
+
+@pytest.mark.parametrize('output_format', [None, 'pretty', 'file'])
+def test_control_output_stream(
+        monkeypatch, tmp_path, capsys, records, output_format
+):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    rows = records('latest-versions')
+    outputs.control_output(
+        (row for row in rows), cli_args('latest-versions', output_format)
+    )
+    if output_format == 'file':
+        output_file, = Path(tmp_path).glob('results/*.csv')
+        written = output_file.read_text(encoding='utf-8').splitlines()
+        assert len(written) == len(rows), (
+            'Убедитесь что в файл записываются все строки потока'
+        )
+    else:
+        captured_out, _ = capsys.readouterr()
+        assert rows[-1][0] in captured_out, (
+            f'Убедитесь что выводятся все строки потока для {output_format}'
+        )
+
+
+def test_file_output_interrupted(monkeypatch, tmp_path, records):
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    rows = records('latest-versions')
+
+    def broken_stream():
+        yield from rows[:2]
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        outputs.control_output(
+            broken_stream(), cli_args('latest-versions', 'file')
+        )
+    output_file, = Path(tmp_path).glob('results/*.csv')
+    written = output_file.read_text(encoding='utf-8').splitlines()
+    assert len(written) == 2, (
+        'Убедитесь что строки, полученные до ошибки, остаются в файле'
+    )
+
+
+def test_sqlite_output(monkeypatch, tmp_path, records):
+    from src import database
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    for _ in range(2):
+        outputs.control_output(records('pep'), cli_args('pep', 'sqlite'))
+    outputs.control_output(
+        records('latest-versions'), cli_args('latest-versions', 'sqlite')
+    )
+    db_path = Path(tmp_path) / 'db' / 'results.sqlite3'
+    assert db_path.exists(), (
+        'Убедитесь что результаты сохраняются в директории `db`'
+    )
+    counts = database.status_counts(db_path)
+    statuses = [row for row in records('pep')[1:] if row[0] != 'Total']
+    assert len(counts) == 2 * len(statuses), (
+        'Убедитесь что в базу попадают все строки каждого запуска `pep` '
+        'без заголовков и итога'
+    )
+    assert {(status, int(quantity)) for _, status, quantity in counts} == {
+        (status, int(quantity)) for status, quantity in statuses
+    }, 'Проверьте количество документов каждого статуса в базе'
+
+
+def test_sqlite_output_unlocked(monkeypatch, tmp_path, records):
+    import sqlite3
+    from src import database
+    monkeypatch.setattr(outputs, 'BASE_DIR', Path(tmp_path))
+    outputs.control_output(records('pep'), cli_args('pep', 'sqlite'))
+    db_path = Path(tmp_path) / 'db' / 'results.sqlite3'
+
+    def crawl():
+        rows = records('pep')
+        yield rows[0]
+        # Another run saves its results while this one still crawls
+        with sqlite3.connect(db_path, timeout=0) as connection:
+            connection.execute(
+                'INSERT INTO runs (mode, started_at) VALUES (?, ?)',
+                ('pep', datetime.now().isoformat())
+            )
+        yield from rows[1:]
+
+    outputs.control_output(crawl(), cli_args('pep', 'sqlite'))
+    assert len(database.status_counts(db_path)) == 2 * (
+        len(records('pep')) - 2
+    ), 'База не должна блокироваться, пока режим загружает страницы'
@@ -0,0 +1,138 @@
+import pytest
+from pathlib import Path
+try:
+    from src.parsers import soup, xpath
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть пакет `parsers`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть пакет `parsers`'
+
+WHATSNEW_INDEX = '''<html><body><div class="body">
+<div class="toctree-wrapper compound"><ul>
+<li class="toctree-l1"><a class="reference" href="3.11.html">3.11</a>
+<ul><li class="toctree-l2"><a href="3.11.html#summary">Summary</a></li></ul>
+</li>
+<li class="toctree-l1"><a class="reference" href="3.10.html">3.10</a></li>
+</ul></div></div></body></html>'''
+WHATSNEW_PAGE = '''<html><body><section>
+<h1>What&#8217;s New In Python 3.10<!-- note --><a href="#t">¶</a></h1>
+<dl class="field-list simple">
+<dt>Release</dt><dd><p>3.10.1</p></dd>
+<dt>Editor</dt><dd><p>Pablo Galindo Salgado</p></dd>
+</dl><dl><dt>Other</dt></dl></section></body></html>'''
+MAIN_PAGE = '''<html><body><div class="sphinxsidebarwrapper">
+<ul><li>Docs by version</li></ul>
+<ul><li><a href="https://docs.python.org/3.12/">Python 3.12 (in development)</a></li>
+<li><a href="https://docs.python.org/2.7/">Python 2.7 (EOL)</a></li>
+<li><a href="https://www.python.org/doc/versions/">All versions</a></li></ul>
+</div></body></html>'''
+DOWNLOAD_PAGE = '''<html><body><table class="docutils align-default">
+<tr><td><a href="archives/python-3.11-docs-pdf-letter.zip">Letter</a></td>
+<td><a href="archives/python-3.11-docs-pdf-a4.zip">A4</a></td></tr>
+</table></body></html>'''
+PEP_INDEX = '''<html><body><section id="index-by-category"><table><tbody>
+<tr><td><abbr>IF</abbr></td><td><a href="pep-0000/">0</a></td></tr>
+</tbody></table></section>
+<section id="numerical-index"><table><tbody>
+<tr><td><abbr title="Informational, Active">IA</abbr></td>
+<td><a href="pep-0001/">1</a></td></tr>
+<tr><td><abbr>S</abbr></td><td><a href="pep-0002/">2</a></td></tr>
+</tbody></table></section></body></html>'''
+PEP_PAGE = '''<html><body><section id="pep-content"><dl>
+<dt>Status<span>:</span></dt><dd><abbr title="Accepted">Accepted</abbr></dd>
+</dl></section></body></html>'''
+
+EXTRACTIONS = [
+    ('whats_new_links', WHATSNEW_INDEX),
+    ('whats_new_article', WHATSNEW_PAGE),
+    ('version_links', MAIN_PAGE),
+    ('artifact_links', DOWNLOAD_PAGE),
+    ('pep_rows', PEP_INDEX),
+    ('pep_status', PEP_PAGE),
+]
+
+
+@pytest.mark.parametrize('function, page', EXTRACTIONS)
+@pytest.mark.parametrize('full_parse', [False, True])
+def test_engines_give_same_data(function, page, full_parse):
+    got = getattr(xpath, function)(page, full_parse)
+    expected = getattr(soup, function)(page, full_parse)
+    assert got == expected, (
+        f'Функция `{function}` должна извлекать одинаковые данные '
+        'движками bs4 и lxml'
+    )
+    assert got, f'Функция `{function}` не извлекла данные со страницы'
+
+
+@pytest.mark.parametrize('function', [name for name, _ in EXTRACTIONS])
+@pytest.mark.parametrize('engine', [soup, xpath])
+def test_engines_raise_same_exception(function, engine):
+    with pytest.raises(BaseException) as excinfo:
+        getattr(engine, function)('You are breathtaken')
+    assert excinfo.typename == 'ParserFindTagException', (
+        f'Функция `{function}` должна выбрасывать '
+        '`ParserFindTagException`, если на странице нет нужного тега'
+    )
+
+
+@pytest.mark.parametrize('engine', [soup, xpath])
+def test_versions_not_found(engine):
+    page = MAIN_PAGE.replace('All versions', 'Versions')
+    with pytest.raises(BaseException) as excinfo:
+        engine.version_links(page)
+    assert excinfo.typename == 'FindVersionsException', (
+        'Функция `version_links` должна выбрасывать `FindVersionsException`, '
+        'если список версий Python не найден'
+    )
+
+
+SNAPSHOTS_DIR = Path(__file__).resolve().parent.parent / 'benchmarks' / 'pages'
+SNAPSHOT_FUNCTIONS = {
+    'whatsnew_index': 'whats_new_links',
+    'whatsnew_page': 'whats_new_article',
+    'main_page': 'version_links',
+    'download': 'artifact_links',
+    'pep_index': 'pep_rows',
+    'pep_page': 'pep_status',
+}
+
+
+@pytest.mark.parametrize('snapshot, function', SNAPSHOT_FUNCTIONS.items())
+def test_engines_on_snapshots(snapshot, function):
+    page = (SNAPSHOTS_DIR / f'{snapshot}.html').read_text(encoding='utf-8')
+    got = {
+        (engine.__name__, full_parse): getattr(engine, function)(
+            page, full_parse
+        )
+        for engine in (soup, xpath) for full_parse in (False, True)
+    }
+    assert len(set(map(repr, got.values()))) == 1, (
+        f'Функция `{function}` должна извлекать одинаковые данные '
+        f'из снимка страницы `{snapshot}` любым движком'
+    )
+
+
+@pytest.mark.parametrize('engine', [soup, xpath])
+def test_shared_extraction(monkeypatch, engine):
+    engine.pep_rows.cache_clear()
+    parse_page = engine.parse_page
+    parsed = []
+
+    def counted_parse_page(*args, **kwargs):
+        parsed.append(1)
+        return parse_page(*args, **kwargs)
+
+    monkeypatch.setattr(engine, 'parse_page', counted_parse_page)
+    first = engine.pep_rows(PEP_INDEX)
+    second = engine.pep_rows(PEP_INDEX)
+    assert second == first and len(parsed) == 1, (
+        'Записи страницы индекса должны браться из памяти без разбора'
+    )
+    second.clear()
+    assert engine.pep_rows(PEP_INDEX) == first, (
+        'Каждый вызов должен получать свою копию записей'
+    )
+    engine.pep_rows.cache_clear()
+    assert engine.pep_rows(PEP_INDEX) == first and len(parsed) == 2, (
+        'После очистки записи страницы должны разбираться заново'
+    )
@@ -0,0 +1,91 @@
+import time
+from http.server import BaseHTTPRequestHandler
+
+try:
+    from src import retries, utils
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `retries.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `retries.py`'
+
+# The collector the requests are recorded by
+collector = utils.collector
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers 503 to the first requests of each page, /slow pages
+    answer the first request late, /down pages never answer well."""
+    requests = {}
+
+    def do_GET(self):
+        number = self.requests[self.path] = self.requests.get(self.path, 0) + 1
+        if self.path.startswith('/slow') and number == 1:
+            time.sleep(1)
+        if self.path.startswith('/down') or (
+                self.path.startswith('/flaky') and number < 3
+        ):
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_retries(policy_session, local_server):
+    base_url = local_server(FlakyHandler)
+    with collector.mode_scope('retries'):
+        response = utils.get_response(policy_session(), f'{base_url}/flaky')
+        metrics = collector.current
+    assert response.status_code == 200, (
+        'Страница с ошибкой 503 должна запрашиваться повторно'
+    )
+    assert metrics.retries == 2 and not metrics.failures
+
+
+def test_retry_budget(policy_session, local_server):
+    base_url = local_server(FlakyHandler)
+    session = policy_session(budget=retries.RetryBudget(ratio=0, reserve=1))
+    with collector.mode_scope('budget'):
+        first = utils.get_response(session, f'{base_url}/down-1')
+        second = utils.get_response(session, f'{base_url}/down-2')
+        metrics = collector.current
+    assert first is None and second is None
+    assert FlakyHandler.requests['/down-1'] == 2, (
+        'Повторные запросы должны ограничиваться бюджетом запуска'
+    )
+    assert FlakyHandler.requests['/down-2'] == 1
+    assert set(metrics.failures) == {
+        f'{base_url}/down-1', f'{base_url}/down-2'
+    }, 'Неудавшиеся страницы должны записываться в метрики'
+
+
+def test_read_timeout(policy_session, local_server):
+    base_url = local_server(FlakyHandler)
+    session = policy_session(read_timeout=0.1, retries=0)
+    start = time.monotonic()
+    assert utils.get_response(session, f'{base_url}/slow-timeout') is None
+    assert time.monotonic() - start < 0.9, (
+        'Запрос без ответа должен прерываться по таймауту'
+    )
+
+
+def test_hedged_request(policy_session, local_server):
+    base_url = local_server(FlakyHandler)
+    session = policy_session(hedge_after=0.05)
+    with collector.mode_scope('hedge'):
+        start = time.monotonic()
+        response = utils.get_response(session, f'{base_url}/slow-hedge')
+        elapsed = time.monotonic() - start
+        metrics = collector.current
+    assert response.text == '/slow-hedge'
+    assert elapsed < 0.9 and metrics.hedges == 1, (
+        'Медленный запрос должен отправляться повторно, '
+        'ответ берется от первого ответившего'
+    )
@@ -0,0 +1,48 @@
+import random
+from collections import Counter
+
+import pytest
+try:
+    from src import sampling
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `sampling.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `sampling.py`'
+
+ITEMS = [('Final', n) for n in range(70)] + [
+    ('Draft', n) for n in range(25)
+] + [('Active', n) for n in range(5)]
+
+
+@pytest.mark.parametrize('size, expected', [
+    (10, {'Final': 7, 'Draft': 2, 'Active': 1}),
+    (20, {'Final': 14, 'Draft': 5, 'Active': 1}),
+    (200, {'Final': 70, 'Draft': 25, 'Active': 5}),
+])
+def test_stratified_sample(size, expected):
+    sample = sampling.stratified_sample(
+        ITEMS, size, lambda item: item[0], random.Random(1)
+    )
+    assert Counter(status for status, _ in sample) == expected, (
+        'Выборка должна делиться между группами пропорционально их размеру'
+    )
+    assert sample == sorted(sample, key=ITEMS.index), (
+        'Элементы выборки должны идти в исходном порядке'
+    )
+
+
+def test_stratified_sample_small():
+    sample = sampling.stratified_sample(
+        ITEMS, 2, lambda item: item[0], random.Random(1)
+    )
+    assert len({status for status, _ in sample}) == 2
+
+
+@pytest.mark.parametrize('failures, trials, expected', [
+    (0, 10, (0.0, 0.2775)),
+    (5, 10, (0.2366, 0.7634)),
+    (0, 0, (0.0, 1.0)),
+])
+def test_wilson_interval(failures, trials, expected):
+    low, high = sampling.wilson_interval(failures, trials)
+    assert (round(low, 4), round(high, 4)) == expected
@@ -0,0 +1,54 @@
+import threading
+import time
+from datetime import timedelta
+
+import requests
+try:
+    from src import server
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `server.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `server.py`'
+
+ROWS = [('Status', 'Quantity'), ('Active', 2), ('Total', 2)]
+
+
+def wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_watcher_refreshes_modes(local_server):
+    runs = {'pep': 0, 'latest-versions': 0}
+    failed = threading.Event()
+
+    def run_mode(mode):
+        runs[mode] += 1
+        if mode == 'latest-versions' and runs[mode] > 1:
+            failed.set()
+            raise ConnectionError
+        return ROWS
+
+    store = server.ResultsStore()
+    watcher = server.Watcher(run_mode, {
+        'pep': timedelta(milliseconds=20),
+        'latest-versions': timedelta(milliseconds=20),
+    }, store)
+    watcher.start()
+    base_url = local_server(server.results_handler(store))
+    wait_for(lambda: runs['pep'] > 2 and failed.is_set())
+    watcher.stop()
+    watcher.join()
+    assert runs['pep'] > 2, 'Режимы должны обновляться по расписанию'
+
+    got = requests.get(f'{base_url}/pep').json()
+    assert got['rows'] == [list(row) for row in ROWS], (
+        'Результаты режима должны отдаваться в формате JSON'
+    )
+    got = requests.get(f'{base_url}/latest-versions').json()
+    assert got['rows'] and got['error'], (
+        'После ошибки должны отдаваться прошлые результаты и текст ошибки'
+    )
+    assert set(requests.get(base_url).json()) == set(runs)
+    assert requests.get(f'{base_url}/whats-new').status_code == 404
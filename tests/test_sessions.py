@@ -0,0 +1,145 @@
+import time
+from http.server import BaseHTTPRequestHandler
+
+from requests_cache import CachedSession
+from conftest import EchoHandler
+try:
+    from src import sessions
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `sessions.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `sessions.py`'
+
+
+def test_async_session_get_many(local_server):
+    base_url = local_server(EchoHandler)
+    session = sessions.AsyncSession(CachedSession(backend='memory'), 4)
+    paths = [f'/page-{number}' for number in range(12)]
+    urls = [base_url + path for path in paths]
+    got = list(session.get_many(urls))
+    assert [response.text for response in got] == paths, (
+        'Метод `get_many` должен возвращать ответы в порядке ссылок'
+    )
+    assert not any(response.from_cache for response in got)
+    cached = session.get_many(urls)
+    assert all(response.from_cache for response in cached), (
+        'Повторные запросы `AsyncSession` должны отдаваться из кеша'
+    )
+    session.close()
+
+
+def test_async_session_thread_clones():
+    session = sessions.AsyncSession(CachedSession(backend='memory'), 2)
+    first, second = (
+        sessions.thread_session(session) for _ in range(2)
+    )
+    assert isinstance(first, CachedSession), (
+        'Копия асинхронной сессии должна копировать вложенную сессию'
+    )
+    with first.cache_disabled():
+        with second.cache_disabled():
+            pass
+        assert first._disabled, (
+            'Отключение кеша в одном потоке не должно зависеть от других'
+        )
+    session.close()
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """Answers 304 Not Modified when the client has the same ETag."""
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            return
+        body = b'Cached page'
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_revalidating_session(local_server):
+    ETagHandler.requests = []
+    url = local_server(ETagHandler) + '/page'
+    session = sessions.RevalidatingSession(backend='memory', expire_after=0)
+    first = session.get(url)
+    second = session.get(url)
+    assert ETagHandler.requests == [None, '"v1"'], (
+        'Устаревшая страница должна проверяться условным запросом'
+    )
+    assert second.status_code == 200 and second.from_cache, (
+        'На ответ 304 должна возвращаться страница из кеша'
+    )
+    assert second.text == first.text == 'Cached page'
+
+
+class KeepAliveHandler(EchoHandler):
+    protocol_version = 'HTTP/1.1'
+
+
+def test_mount_pools_reuse(local_server):
+    from src.utils import get_responses
+    base_url = local_server(KeepAliveHandler)
+    session = CachedSession(backend='memory')
+    sessions.mount_pools(session, 4)
+    urls = [f'{base_url}/page-{number}' for number in range(12)]
+    got = get_responses(session, urls, workers=4)
+    assert [response.text for response in got] == [
+        url[len(base_url):] for url in urls
+    ]
+    connections, requests = sessions.pool_stats(session)
+    assert requests == len(urls)
+    assert 1 <= connections <= 4, (
+        'Потоки должны переиспользовать соединения из пула, '
+        'а не открывать новое соединение для каждой страницы'
+    )
+    assert 'gzip' in session.headers['Accept-Encoding']
+
+
+class CountingHandler(EchoHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        super().do_GET()
+
+
+def test_async_session_get_many_window(local_server):
+    CountingHandler.requests = []
+    base_url = local_server(CountingHandler)
+    session = sessions.AsyncSession(CachedSession(backend='memory'), 2)
+    urls = [f'{base_url}/page-{number}' for number in range(20)]
+    got = session.get_many(urls)
+    assert next(got).text == '/page-0'
+    time.sleep(0.2)
+    assert len(CountingHandler.requests) <= 2 * sessions.PREFETCH_FACTOR + 1, (
+        'Метод `get_many` должен запрашивать только ограниченное число '
+        'страниц наперёд'
+    )
+    got.close()
+    assert len(CountingHandler.requests) < len(urls)
+    session.close()
+
+
+def test_revalidating_session_shared_pages(local_server):
+    CountingHandler.requests = []
+    url = local_server(CountingHandler) + '/page'
+    session = sessions.RevalidatingSession(backend='memory', expire_after=0)
+    session.share_pages(2**20)
+    first = session.get(url)
+    assert session.get(url) is first, (
+        'Страница, загруженная одним режимом, должна браться из памяти'
+    )
+    session.get(url, headers={'If-None-Match': '"v1"'})
+    assert CountingHandler.requests == ['/page', '/page'], (
+        'Условные запросы должны доходить до сервера'
+    )
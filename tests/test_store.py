@@ -0,0 +1,38 @@
+import os
+
+try:
+    from src import store
+except ModuleNotFoundError:
+    assert False, 'Убедитесь что в директории `src` есть файл `store.py`'
+except ImportError:
+    assert False, 'Убедитесь что в директории `src` есть файл `store.py`'
+
+
+def test_store_file(tmp_path):
+    objects_dir = tmp_path / 'objects'
+    first, second = tmp_path / 'first.zip', tmp_path / 'second.zip'
+    first.write_bytes(b'archive')
+    second.write_bytes(b'archive')
+    assert store.store_file(objects_dir, first) is False
+    assert store.store_file(objects_dir, second) is True, (
+        'Файл с сохраненным содержимым должен заменяться жесткой ссылкой'
+    )
+    assert os.path.samefile(first, second)
+    assert second.read_bytes() == b'archive'
+    assert store.store_file(objects_dir, second) is False
+
+
+def test_prune_store(tmp_path):
+    objects_dir = tmp_path / 'objects'
+    path = tmp_path / 'archive.zip'
+    path.write_bytes(b'old')
+    store.store_file(objects_dir, path)
+    path.unlink()
+    path.write_bytes(b'new')
+    store.store_file(objects_dir, path)
+    assert store.prune_store(objects_dir) == 3, (
+        'Содержимое без ссылок на него должно удаляться из хранилища'
+    )
+    assert [stored.read_bytes() for stored in objects_dir.glob('*/*')] == [
+        b'new'
+    ]
@@ -54,3 +54,18 @@ def test_get_response(mock_session):
             'делает запрос к странице и возвращает ответ. \n'
             'Кстати: You are breathtaken!'
         )
+
+
+def test_get_responses_order(mock_session):
+    urls = [f'{MAIN_DOC_URL}page-{number}/' for number in range(10)]
+    with requests_mock.Mocker() as mock:
+        for url in urls:
+            mock.get(url, text=url)
+        got = [
+            response.text
+            for response in utils.get_responses(mock_session, urls, 3)
+        ]
+    assert got == urls, (
+        'Функция `get_responses` должна возвращать ответы '
+        'в порядке переданных ссылок'
+    )